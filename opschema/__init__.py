@@ -1,11 +1,31 @@
+import os
+import sys
 import importlib
-import inspect
+import traceback
+import functools
+import threading
 from . import schema
 from . import ops
+from . import manifest
+from . import framework
+from . import diskcache
 
 REGISTRY = {}
 
-def register(*op_paths):
+# directory of the on-disk schema cache, or None if disabled.  See
+# set_cache_dir
+CACHE_DIR = os.environ.get('OPSCHEMA_CACHE_DIR') or None
+
+def set_cache_dir(cache_dir):
+    """
+    Store initialized schemas in `cache_dir`, and load them from there when
+    their schema files and the opschema version are unchanged.  None disables
+    the cache.  The default is the environment variable OPSCHEMA_CACHE_DIR.
+    """
+    global CACHE_DIR
+    CACHE_DIR = cache_dir
+
+def register(*op_paths, lazy=True):
     """
     For each op_path in `op_paths`, instantiates a schema.OpSchema instance
     initialized to the op_path schema.  Wraps the TensorFlow op with it.  To retrieve
@@ -15,6 +35,9 @@ def register(*op_paths):
     issue detailed error messages based on violations of constraints defined in the
     schema.
 
+    If `lazy`, the TensorFlow op is replaced by a LazyOp, and the schema is
+    only built on the first call of the op (or by get(op_path)).
+
     To see the constraints, use opschema.explain(op_path)
     """
     if len(op_paths) == 0:
@@ -22,17 +45,9 @@ def register(*op_paths):
 
     for op_path in op_paths:
         try:
-            _register(op_path)
+            _register(op_path, lazy)
         except BaseException as ex:
-            trace = inspect.trace()
-            print('Trace:')
-            for t in trace:
-                print(inspect.getsource(t))
-            # print('\n'.join(str(t) for t in trace))
-            # trace = inspect.trace()
-            # print(inspect.stack())
-            print(f'Got exception: {ex} while registering op '
-                    f'\'{op_path}\'.  Skipping.')
+            _report_failure(op_path, ex)
 
 def deregister(*op_paths):
     """
@@ -44,43 +59,109 @@ def deregister(*op_paths):
 
     for op_path in op_paths:
         try:
-            _deregister(op_path)
+            _unregister(op_path)
         except RuntimeError as ex:
             pass
 
 def list_schemas():
     """
     List all op schemas available for opschema.register().  Each schema is
-    defined in a file in the ops/ directory.
+    defined in a file in the ops/ directory, and listed in opschema.manifest.
     """
-    from pkgutil import walk_packages
-    modinfos = list(walk_packages(ops.__path__, ops.__name__ + '.'))
-    op_paths = [mi.name.split('.',2)[2] for mi in modinfos if not mi.ispkg]
-    return op_paths
+    return list(manifest.SIGNATURES.keys())
 
-def init_op(op_path):
+def init_op(op_path, framework_op=None):
     """
     Returns an initialized schema.OpSchema for `op_path`, but does not wrap the
     TensorFlow op with it.
     """
+    if CACHE_DIR is not None:
+        op = diskcache.load(CACHE_DIR, op_path)
+        if op is not None:
+            op._framework_op = framework_op
+            return op
+
     op = schema.OpSchema(op_path)
     schema_module = importlib.import_module(f'.ops.{op_path}', __name__)
-    op._init(schema_module.init_schema)
+    op._init(schema_module.init_schema, framework_op)
+    if CACHE_DIR is not None:
+        try:
+            diskcache.store(CACHE_DIR, op)
+        except Exception as ex:
+            print(f'Could not store schema \'{op_path}\' in cache '
+                    f'\'{CACHE_DIR}\': {ex}', file=sys.stderr)
     return op
 
-def _register(op_path):
-    """
-    Instantiates an initialized schema.OpSchema for `op_path`, and wraps the
-    TensorFlow operation with it.
+def _report_failure(op_path, ex):
+    print('Trace:')
+    print(''.join(traceback.format_exception(type(ex), ex, ex.__traceback__)))
+    print(f'Got exception: {ex} while registering op '
+            f'\'{op_path}\'.  Skipping.')
+
+class LazyOp(object):
+    """
+    Stands in for a TensorFlow op until its first call, when it builds the
+    schema.OpSchema, wraps the op with it and installs the wrapped op in its
+    place.  If the schema cannot be built, the original op is restored.
+    """
+    def __init__(self, op_path, framework_op):
+        self.op_path = op_path
+        self.framework_op = framework_op
+        self.op = None
+        self.lock = threading.Lock()
+        functools.update_wrapper(self, framework_op)
+
+    def load(self):
+        """
+        Build and install the wrapped op if not yet done, returning the
+        schema.OpSchema, or None if it could not be built
+        """
+        with self.lock:
+            if self.op is not None or REGISTRY.get(self.op_path) is not self:
+                return self.op
+            func_name = self.op_path.rsplit('.',1)[1]
+            try:
+                op = init_op(self.op_path, self.framework_op)
+                wrapped_op = op._wrapped()
+            except BaseException as ex:
+                _report_failure(self.op_path, ex)
+                _unregister(self.op_path)
+                return None
+            if getattr(op.framework_mod, func_name, None) is self:
+                setattr(op.framework_mod, func_name, wrapped_op)
+            REGISTRY[self.op_path] = op
+            self.op = op
+            return op
+
+    def __call__(self, *args, **kwargs):
+        op = self.op or self.load()
+        if op is None:
+            return self.framework_op(*args, **kwargs)
+        return op.wrapped_op(*args, **kwargs)
+
+def _framework_module(op_path):
+    return framework.get_module(op_path.split('.', 1)[0])
+
+def _register(op_path, lazy=True):
+    """
+    Wraps the TensorFlow operation with an initialized schema.OpSchema for
+    `op_path`, or with a LazyOp which creates it on first use.
     """
     if op_path in REGISTRY:
         return
 
-    import tensorflow as tf
+    fw_mod = _framework_module(op_path)
     func_name = op_path.rsplit('.',1)[1]
-    op = init_op(op_path)
+    if lazy:
+        lazy_op = LazyOp(op_path, framework.resolve(op_path))
+        setattr(fw_mod, func_name, lazy_op)
+        REGISTRY[op_path] = lazy_op
+        return
+
+    # resolve the op before installing the wrapper in its place
+    op = init_op(op_path, framework.resolve(op_path))
     wrapped_op = op._wrapped()
-    setattr(tf, func_name, wrapped_op)
+    setattr(fw_mod, func_name, wrapped_op)
     REGISTRY[op_path] = op
 
 def _unregister(op_path):
@@ -93,7 +174,7 @@ def _unregister(op_path):
             f'Op path \'{op_path}\' is not registered so cannot be '
             f'de-registered')
     func_name = op_path.rsplit('.',1)[1]
-    setattr(op.framework_mod, func_name, op.framework_op)
+    setattr(_framework_module(op_path), func_name, op.framework_op)
 
 def get(op_path):
     """
@@ -105,6 +186,11 @@ def get(op_path):
             f'registry.  Use opschema.inventory() to see available ops, '
             f'and then register chosen ops with opschema.register()')
     op = REGISTRY[op_path]
+    if isinstance(op, LazyOp):
+        op = op.load()
+        if op is None:
+            raise RuntimeError(
+                f'Could not build the schema for \'{op_path}\'')
     return op
 
 def validate(op_path, out_dir, test_ids, skip_ids, dtype_err_quota):
@@ -1,7 +1,7 @@
-import tensorflow as tf
 import numpy as np
 import enum
 import re
+import itertools
 from collections import namedtuple, OrderedDict
 from .error import SchemaError
 from . import fgraph
@@ -27,6 +27,10 @@ class CompDimsMode(enum.Enum):
     SnakeCaseDesc = 2
     StringDims = 3
 
+class FixSearch(enum.Enum):
+    DepthFirst = 0 # enumerate all hypotheses within the edit budget
+    BestFirst = 1  # expand hypotheses in order of increasing edit cost
+
 def snake_case(phrase):
     return phrase.replace(' ', '_')
 
@@ -91,7 +95,7 @@ def range_under_size(idx_ranges, max_prod, rng):
 
     lows = [lo for lo, _ in idx_ranges]
     ncomp = len(idx_ranges)
-    runs = [np.prod(lows[i+1:], dtype=int) for i in range(ncomp)]
+    runs = [int(np.prod(lows[i+1:], dtype=int)) for i in range(ncomp)]
     if lows[0] * runs[0] > max_prod:
         raise SchemaError(
             f'range_under_size: idx_ranges {idx_ranges} '
@@ -110,6 +114,51 @@ def range_under_size(idx_ranges, max_prod, rng):
         dims.append(d)
     return dims
 
+def covering_array(sizes, strength):
+    """
+    Return a list of rows, each a tuple of indices i_c in range(sizes[c]),
+    such that for every choice of {strength} columns, every combination of
+    their values occurs in at least one row (a t-wise covering array, with
+    t = {strength}).  If {strength} >= len(sizes), this is the full product.
+    Rows are chosen greedily and deterministically.
+    """
+    ncols = len(sizes)
+    if strength >= ncols or 0 in sizes:
+        return list(itertools.product(*(range(s) for s in sizes)))
+
+    col_sets = list(itertools.combinations(range(ncols), strength))
+    uncovered = set()
+    for cols in col_sets:
+        for vals in itertools.product(*(range(sizes[c]) for c in cols)):
+            uncovered.add((cols, vals))
+
+    def covered_by(row):
+        return { (cols, tuple(row[c] for c in cols)) for cols in col_sets }
+
+    rows = []
+    while uncovered:
+        # seed the row with the first uncovered tuple, then fill each
+        # remaining column with the value completing the most uncovered tuples
+        cols, vals = min(uncovered)
+        row = [None] * ncols
+        for c, v in zip(cols, vals):
+            row[c] = v
+        for c in range(ncols):
+            if row[c] is not None:
+                continue
+            best_val, best_num = 0, -1
+            for v in range(sizes[c]):
+                row[c] = v
+                num = sum(1 for cs in col_sets 
+                        if c in cs and all(row[i] is not None for i in cs)
+                        and (cs, tuple(row[i] for i in cs)) in uncovered)
+                if num > best_num:
+                    best_val, best_num = v, num
+            row[c] = best_val
+        rows.append(tuple(row))
+        uncovered -= covered_by(row)
+    return rows
+
 class ShapeKind(enum.Enum):
     """
     For describing the kind of input that defines a shape
@@ -368,9 +417,7 @@ def parse_dtype_expr(type_expr):
             ids = [ f'{pfx}{sz}' for sz in exprs[pfx] if sz >= int(q) ]
         else:
             ids = [ f'{pfx}{sz}' for sz in exprs[pfx] if sz <= int(q) ]
-    try:
-        dtypes = [ tf.dtypes.as_dtype(i) for i in ids ]
-    except TypeError:
+    if any(i not in ALL_DTYPES for i in ids):
         raise err_msg
     return ids
 
@@ -445,6 +492,13 @@ class DTypeRules(object):
         self.indices = indices
         self.initialized = True
 
+    def __getstate__(self):
+        # indices may be a live view of the schema's index names
+        state = self.__dict__.copy()
+        if 'indices' in state:
+            state['indices'] = list(state['indices'])
+        return state
+
     def add_indiv_rule(self, tensor, valid_types):
         self.indiv_rules[tensor] = valid_types
 
@@ -569,6 +623,19 @@ class DataFormats(object):
     def num_layouts(self):
         return len({ lr[0] for lr in self.formats.values() })
 
+    def matching_layouts(self, obs_args):
+        """
+        Return the layouts which could be imputed without editing the
+        observed data_format
+        """
+        obs_fmt = self.observed_format(obs_args)
+        if obs_fmt is None:
+            return list(range(self.num_layouts()))
+        elif obs_fmt not in self.formats:
+            return []
+        else:
+            return [self.layout(obs_fmt)]
+
     def all_formats(self):
         return list(self.formats.keys())
 
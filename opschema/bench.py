@@ -0,0 +1,186 @@
+import io
+import sys
+import json
+import time
+import platform
+import itertools
+import statistics
+import opschema
+from . import framework
+from .redirect import stderr_redirector
+
+"""
+Benchmarks of the schemas under opschema/ops, runnable on CPU.  For each op,
+run measures:
+
+init_secs       opschema.init_op (the first call includes importing the schema)
+register_secs   opschema.register
+explain_secs    OpSchema.explain
+gen_per_sec     configurations produced per second by generate_args
+check_secs      median _check_args latency, by the edit distance of the
+                verdict ('0' for valid arguments, 'local' for errors found
+                while parsing single arguments)
+check_errors    number of tests whose check raised an exception.  If all of
+                them do, the op records an error instead
+raw_secs        median call time of the framework op, for valid and invalid
+                calls
+wrapped_secs    median call time of the wrapped op, for valid and invalid
+                calls
+
+Results are written as JSON, and two result files are compared with compare.
+"""
+
+def _median_secs(func, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception:
+            pass
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def _verdict_distance(op_error):
+    if op_error is None:
+        return '0'
+    elif isinstance(op_error, list):
+        return str(min(fix.cost() for fix in op_error))
+    else:
+        return 'local'
+
+def bench_op(op_path, num_tests=50, gen_tests=500, test_edits=1,
+        rand_seed=0, repeats=3):
+    """
+    Run all benchmarks for {op_path}, returning a map of metric => value.
+    Checks and calls use the first {num_tests} generated tests with
+    {test_edits} edits, and generation throughput is measured over the first
+    {gen_tests}.
+    """
+    res = {}
+    # the unwrapped op, resolved before register installs the wrapper
+    framework_op = framework.resolve(op_path)
+    start = time.perf_counter()
+    op = opschema.init_op(op_path, framework_op)
+    res['init_secs'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    opschema.register(op_path, lazy=False)
+    res['register_secs'] = time.perf_counter() - start
+    try:
+        start = time.perf_counter()
+        op.explain()
+        res['explain_secs'] = time.perf_counter() - start
+
+        op.avail_test_edits = test_edits
+        op.dtype_err_quota = 1
+        start = time.perf_counter()
+        num_gen = sum(1 for _ in itertools.islice(
+            op.generate_args(rand_seed), gen_tests))
+        secs = time.perf_counter() - start
+        res['gen_per_sec'] = num_gen / secs if secs > 0 else 0.0
+
+        cases = list(itertools.islice(op.generate_args(rand_seed), num_tests))
+        wop = opschema.get(op_path)
+        check_times = {}
+        check_errors = []
+        call_times = { 'valid': ([], []), 'invalid': ([], []) }
+        with stderr_redirector(io.BytesIO()):
+            for op_args in cases:
+                args = { k: v.value() for k, v in op_args.items() }
+                start = time.perf_counter()
+                try:
+                    op_error = op._check_args(**args)
+                except Exception as ex:
+                    check_errors.append(ex)
+                    continue
+                secs = time.perf_counter() - start
+                dist = _verdict_distance(op_error)
+                check_times.setdefault(dist, []).append(secs)
+
+                raw, wrapped = call_times['valid' if dist == '0' else
+                        'invalid']
+                raw.append(_median_secs(
+                    lambda: framework_op(**args), repeats))
+                wrapped.append(_median_secs(
+                    lambda: wop.wrapped_op(**args), repeats))
+
+        if cases and len(check_errors) == len(cases):
+            ex = check_errors[0]
+            raise RuntimeError(f'All {len(cases)} checks failed, the first '
+                    f'with {type(ex).__name__}: {ex}')
+        res['check_errors'] = len(check_errors)
+        res['check_secs'] = { d: statistics.median(t)
+                for d, t in sorted(check_times.items()) }
+        res['raw_secs'] = { k: statistics.median(raw)
+                for k, (raw, _) in call_times.items() if raw }
+        res['wrapped_secs'] = { k: statistics.median(wrapped)
+                for k, (_, wrapped) in call_times.items() if wrapped }
+    finally:
+        opschema._unregister(op_path)
+    return res
+
+def run(out_file, op_paths=None, **bench_kwargs):
+    """
+    Benchmark each of {op_paths} (default all schemas) and write the results
+    to {out_file} as JSON.  An op which fails records its error instead.
+    """
+    import tensorflow as tf
+    if op_paths is None:
+        op_paths = opschema.list_schemas()
+    ops = {}
+    for op_path in op_paths:
+        print(f'Benchmarking {op_path}', file=sys.stderr, flush=True)
+        try:
+            ops[op_path] = bench_op(op_path, **bench_kwargs)
+        except Exception as ex:
+            ops[op_path] = { 'error': f'{type(ex).__name__}: {ex}' }
+    report = {
+            'python': platform.python_version(),
+            'tensorflow': tf.__version__,
+            'platform': platform.platform(),
+            'settings': bench_kwargs,
+            'ops': ops
+            }
+    with open(out_file, 'w') as fh:
+        json.dump(report, fh, indent=2)
+    return report
+
+def _flatten(metrics, prefix=''):
+    flat = {}
+    for key, val in metrics.items():
+        if isinstance(val, dict):
+            flat.update(_flatten(val, f'{prefix}{key}.'))
+        elif isinstance(val, (int, float)):
+            flat[f'{prefix}{key}'] = val
+    return flat
+
+def compare(baseline_file, current_file, threshold=0.2):
+    """
+    Compare the metrics of two result files written by run.  Return a list
+    of (op_path, metric, baseline, current) for every metric worse in
+    {current_file} by more than the fraction {threshold}.  Rates (per_sec)
+    are better when higher, times when lower.  A metric of the baseline
+    missing from {current_file}, for example because its op failed or was
+    not run, is reported with current None.
+    """
+    with open(baseline_file) as fh:
+        base = json.load(fh)['ops']
+    with open(current_file) as fh:
+        cur = json.load(fh)['ops']
+
+    regressions = []
+    for op_path in sorted(base.keys()):
+        base_metrics = _flatten(base[op_path])
+        cur_metrics = _flatten(cur.get(op_path, {}))
+        for metric in sorted(base_metrics.keys()):
+            b, c = base_metrics[metric], cur_metrics.get(metric)
+            if c is None:
+                worse = True
+            elif metric.endswith('per_sec'):
+                worse = c < b / (1 + threshold)
+            else:
+                worse = c > b * (1 + threshold)
+            if worse:
+                regressions.append((op_path, metric, b, c))
+    return regressions
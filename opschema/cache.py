@@ -0,0 +1,62 @@
+import threading
+from collections import OrderedDict
+
+"""
+Bounded caches used by OpSchema
+"""
+
+class LRUCache(object):
+    """
+    A mapping holding at most {maxsize} items, evicting the least recently
+    used item when full.  Keeps hit, miss and eviction counts.  Safe to
+    share between threads.
+    """
+    def __init__(self, maxsize):
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise RuntimeError(
+                f'{type(self).__qualname__}: maxsize must be a positive '
+                f'integer.  Got {maxsize}')
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, key):
+        """
+        Return the value stored for {key}, or None if absent
+        """
+        with self.lock:
+            val = self.items.get(key)
+            if val is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.items.move_to_end(key)
+            return val
+
+    def put(self, key, val):
+        with self.lock:
+            self.items[key] = val
+            self.items.move_to_end(key)
+            if len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+    def stats(self):
+        return {
+                'size': len(self.items),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+                }
+
@@ -3,7 +3,11 @@ import pickle
 import sys
 import os
 import opschema
+from opschema.error import SchemaError
+from opschema import parallel, corpus, server, bench as benchmarks
 import random
+import itertools
+import time
 import numpy as np
 import signal
 from multiprocessing import Process
@@ -13,37 +17,61 @@ def list_schemas():
     for op_path in opschema.list_schemas():
         print(op_path)
 
-def gen_input(op_path, out_dir):
-    op = opschema.init_op(op_path)
-    inputs = list(op.generate_args())
-    file_name = os.path.join(out_dir, f'{op_path}.inputs.pkl')
-    with open(file_name, 'wb') as fh:
-        pickle.dump(inputs, fh) 
-
-def test_op(op_path, out_dir, test_id):
-    # file_name = os.path.join(out_dir, f'{op_path}.inputs.pkl')
-    # with open(file_name, 'rb') as fh:
-        # inputs = pickle.load(fh)
-    opschema.register(op_path)
-    op = opschema.get(op_path)
-    
-    gen = op.generate_args()
-    for test_num, op_args in enumerate(gen, 1):
-        if test_num == test_id:
-            args = { k: v.value() for k, v in op_args.items() }
-            try:
-                print('OpSchema message:')
-                op.wrapped_op(**args)
-            except:
-                print('TensorFlow traceback:')
-                sys.excepthook(*sys.exc_info())
-            break
+def corpus_file(op_path, out_dir):
+    return os.path.join(out_dir, f'{op_path}.corpus')
 
-def validate(op_path, out_dir, test_ids=None, skip_ids=None, max_dtype_err=0,
-        test_edits=0, rand_seed=0, show_traceback=False):
-    opschema.register(op_path)
-    op = opschema.get(op_path)
+def gen_input(op_path, out_dir, test_edits=0, rand_seed=0, max_dtype_err=0,
+        max_tests=None):
+    op = server.init_op(op_path)
+    path = corpus_file(op_path, out_dir)
+    num_cases = corpus.write(op, path, rand_seed, test_edits, max_dtype_err, 
+            max_tests)
+    print(f'Wrote {num_cases} test cases to {path}')
+
+def test_op(op_path, out_dir, test_id, max_dtype_err=0, test_edits=0,
+        rand_seed=0, cover=None):
+    """
+    Run test {test_id}, printing the opschema message and any TensorFlow
+    traceback.  The test is read from the corpus in {out_dir} written by
+    gen_input if there is one, which must have been written with the same
+    settings.
+    """
+    op = server.init_op(op_path)
+    op._wrapped()
+
+    path = corpus_file(op_path, out_dir)
+    if os.path.exists(path):
+        if cover is not None:
+            raise SchemaError(
+                f'Corpus \'{path}\' holds generated tests, not a covering '
+                f'array.  Remove it to use --cover')
+        with corpus.Corpus(path) as cor:
+            cor.check_settings(rand_seed, test_edits, max_dtype_err)
+            op_args = cor.get(test_id)
+    else:
+        op.dtype_err_quota = max_dtype_err
+        op.avail_test_edits = test_edits
+        op.cover_strength = cover
+        op_args = op.get_args(test_id, rand_seed)
+
+    args = { k: v.value() for k, v in op_args.items() }
+    try:
+        print('OpSchema message:')
+        op.wrapped_op(**args)
+    except:
+        print('TensorFlow traceback:')
+        sys.excepthook(*sys.exc_info())
 
+def validate(op_path, out_dir, test_ids=None, skip_ids=None, max_dtype_err=0,
+        test_edits=0, rand_seed=0, show_traceback=False, workers=1,
+        resume=False, corpus_path=None, sample=None, stratified=False,
+        time_budget=None, cover=None, unique=True, sandbox=False,
+        test_timeout=None, max_worker_tests=None, max_worker_rss=None):
+    """
+    Run the tests of {op_path}, writing the results to {out_dir}.  With
+    {sandbox} or a {test_timeout}, the tests are run by {workers} sandbox
+    processes, isolating crashes and hangs.  See OpSchema.validate
+    """
     if isinstance(test_ids, int):
         test_ids = {test_ids}
     elif isinstance(test_ids, tuple):
@@ -54,25 +82,161 @@ def validate(op_path, out_dir, test_ids=None, skip_ids=None, max_dtype_err=0,
     elif isinstance(skip_ids, tuple):
         skip_ids = set(skip_ids)
 
-    return op.validate(out_dir, test_ids, skip_ids, max_dtype_err, test_edits,
-            rand_seed, show_traceback)
+    sandbox_workers = None
+    if sandbox or test_timeout is not None:
+        sandbox_workers = workers
+    elif workers > 1:
+        parallel.validate(op_path, out_dir, workers, test_ids, skip_ids,
+                max_dtype_err, test_edits, rand_seed, show_traceback, resume,
+                corpus_path, sample, stratified, time_budget, cover, unique)
+        return
+
+    if sandbox_workers is None:
+        opschema.register(op_path)
+        op = opschema.get(op_path)
+    else:
+        # the framework is only needed in the workers
+        op = server.init_op(op_path)
+    op.validate(out_dir, test_ids, skip_ids, max_dtype_err, test_edits,
+            rand_seed, show_traceback, resume=resume, corpus_path=corpus_path,
+            sample=sample, stratified=stratified, time_budget=time_budget,
+            cover=cover, unique=unique, sandbox_workers=sandbox_workers,
+            test_timeout=test_timeout, max_worker_tests=max_worker_tests,
+            max_worker_rss=max_worker_rss)
+
+def count(op_path, test_edits=0, max_dtype_err=0, rand_seed=0):
+    """
+    Print the number of tests that validate would run, in total and broken
+    down by layout, index ranks and kinds of edits
+    """
+    op = server.init_op(op_path)
+    op.avail_test_edits = test_edits
+    op.dtype_err_quota = max_dtype_err
+    counts = op.count_tests(rand_seed)
+
+    def show(title, key_func):
+        print(title)
+        marginal = {}
+        for key, num in counts.items():
+            k = key_func(key)
+            marginal[k] = marginal.get(k, 0) + num
+        for k, num in sorted(marginal.items()):
+            print(f'  {k:<30} {num:>10}')
+
+    print(f'Total tests: {sum(counts.values())}')
+    show('By layout:', lambda key: str(key[0]))
+    show('By index ranks:', 
+            lambda key: ' '.join(f'{idx}:{rank}' for idx, rank in key[1]))
+    show('By edit kind:', lambda key: '+'.join(key[2]) or 'none')
+
+def profile(op_path, num_tests=100, test_edits=0, max_dtype_err=0,
+        rand_seed=0, trace=None):
+    """
+    Generate {num_tests} tests and check the arguments of each, printing
+    per-node call counts, yields, edits and times.  If {trace} is a path,
+    also write a Chrome trace of the run to it.
+    """
+    op = server.init_op(op_path)
+    op.avail_test_edits = test_edits
+    op.dtype_err_quota = max_dtype_err
+
+    with op.profile(trace is not None) as prof:
+        start = time.perf_counter()
+        cases = list(itertools.islice(op.generate_args(rand_seed), num_tests))
+        gen_secs = time.perf_counter() - start
+        check_secs = 0
+        for op_args in cases:
+            args = { k: v.value() for k, v in op_args.items() }
+            start = time.perf_counter()
+            op._check_args(**args)
+            check_secs += time.perf_counter() - start
+
+    print(f'Generated {len(cases)} tests in {gen_secs:.3f}s, '
+            f'checked in {check_secs:.3f}s')
+    for graph, secs in sorted(prof.graph_totals().items()):
+        print(f'  {graph:<12} {secs:>10.3f}s')
+    print(prof.table())
+    if trace is not None:
+        prof.write_trace(trace)
+        print(f'Wrote trace to {trace}')
+
+def bench(out_file, ops=None, num_tests=50, gen_tests=500, test_edits=1,
+        rand_seed=0):
+    """
+    Benchmark the schemas in {ops} (default all) and write the results to
+    {out_file} as JSON.  See opschema.bench
+    """
+    if isinstance(ops, str):
+        ops = [ops]
+    report = benchmarks.run(out_file, ops, num_tests=num_tests,
+            gen_tests=gen_tests, test_edits=test_edits, rand_seed=rand_seed)
+    for op_path, res in report['ops'].items():
+        if 'error' in res:
+            print(f'{op_path:<40} {res["error"]}')
+        else:
+            print(f'{op_path:<40} init: {res["init_secs"]:.3f}s  '
+                    f'gen: {res["gen_per_sec"]:.0f}/s')
+    print(f'Wrote {out_file}')
+
+def bench_compare(baseline_file, current_file, threshold=0.2):
+    """
+    Report metrics of {current_file} worse than {baseline_file} by more than
+    the fraction {threshold}, exiting with status 1 if there are any
+    """
+    regressions = benchmarks.compare(baseline_file, current_file, threshold)
+    for op_path, metric, base, cur in regressions:
+        cur = 'missing' if cur is None else f'{cur:.6g}'
+        print(f'{op_path:<40} {metric:<25} {base:>12.6g} => {cur:>12}')
+    if regressions:
+        print(f'{len(regressions)} regressions beyond {threshold:.0%}')
+        sys.exit(1)
+    print('No regressions')
 
 def explain(op_path, include_inventory=False):
-    return opschema.explain(op_path, include_inventory)
+    op = server.init_op(op_path)
+    print(op.explain(include_inventory))
+
+def serve(socket=None, preload=()):
+    """
+    Run the opschema daemon on Unix socket {socket} (default
+    $OPSCHEMA_SOCKET, or opschema-UID.sock in the temp directory), keeping
+    TensorFlow, the ops {preload} and the schemas used by commands loaded.
+    While it runs, the other commands are run by it.  See opschema.server
+    """
+    if isinstance(preload, str):
+        preload = [preload]
+    server.serve(COMMANDS, socket, preload)
+
+def stop():
+    """
+    Stop the opschema daemon.  (Only reached if none is running)
+    """
+    print('No opschema daemon is running')
 
 def graph(op_path, out_dir):
     opschema.print_graphs(op_path, out_dir)
 
+COMMANDS = {
+        'list': list_schemas,
+        'explain': explain,
+        'count': count,
+        'profile': profile,
+        'bench': bench,
+        'bench_compare': bench_compare,
+        'gen_input': gen_input,
+        'test_op': test_op,
+        'validate': validate,
+        'graph': graph,
+        'serve': serve,
+        'stop': stop
+}
+
 def main():
-    func_map = { 
-            'list': list_schemas,
-            'explain': explain,
-            # 'gen_input': gen_input,
-            # 'test_op': test_op,
-            'validate': validate,
-            'graph': graph
-            }
-    fire.Fire(func_map)
+    if len(sys.argv) > 1 and sys.argv[1] != 'serve':
+        status = server.forward(sys.argv)
+        if status is not None:
+            sys.exit(status)
+    fire.Fire(COMMANDS)
 
 if __name__ == '__main__':
     main()
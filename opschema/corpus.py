@@ -0,0 +1,117 @@
+import os
+import json
+import struct
+import itertools
+from . import oparg
+from .error import SchemaError
+
+"""
+An on-disk corpus of the test cases produced by OpSchema.generate_args.  Each
+test case is a map of arg_name => OpArg, stored as its encoding (shapes, dtypes
+and values, but no tensors) so that loading it does not require running the
+generation graph.
+
+The corpus consists of two files:
+
+{path}       A header line, then one JSON line per test case in test id order
+{path}.idx   The byte offset of each test case line in {path}, as a packed
+             array of unsigned 64-bit integers, so that case N is found by a
+             single seek.
+"""
+
+_OFFSET = struct.Struct('<Q')
+
+def index_path(path):
+    return f'{path}.idx'
+
+def write(op, path, rand_seed=0, test_edits=0, dtype_err_quota=0, 
+        max_tests=None):
+    """
+    Generate the test cases of {op} and write them as a corpus at {path}.
+    Returns the number of cases written
+    """
+    op.dtype_err_quota = dtype_err_quota
+    op.avail_test_edits = test_edits
+    header = {
+            'op_path': op.op_path,
+            'rand_seed': rand_seed,
+            'test_edits': test_edits,
+            'dtype_err_quota': dtype_err_quota
+            }
+    num_cases = 0
+    with open(path, 'wb') as data_fh, open(index_path(path), 'wb') as idx_fh:
+        data_fh.write(json.dumps(header).encode('utf-8') + b'\n')
+        cases = enumerate(op.generate_args(rand_seed), 1)
+        if max_tests is not None:
+            # stop before drawing case max_tests + 1
+            cases = itertools.islice(cases, max_tests)
+        for test_id, op_args in cases:
+            args = { name: arg.encode() for name, arg in op_args.items() }
+            line = json.dumps({ 'test_id': test_id, 'args': args })
+            idx_fh.write(_OFFSET.pack(data_fh.tell()))
+            data_fh.write(line.encode('utf-8') + b'\n')
+            num_cases = test_id
+    return num_cases
+
+class Corpus(object):
+    """
+    Read-only access to a corpus written by corpus.write
+    """
+    def __init__(self, path):
+        self.path = path
+        self.data_fh = open(path, 'rb')
+        self.idx_fh = open(index_path(path), 'rb')
+        self.header = json.loads(self.data_fh.readline())
+        self.num_cases = os.path.getsize(index_path(path)) // _OFFSET.size
+
+    def __len__(self):
+        return self.num_cases
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.data_fh.close()
+        self.idx_fh.close()
+
+    @property
+    def op_path(self):
+        return self.header['op_path']
+
+    def check_settings(self, rand_seed, test_edits, dtype_err_quota):
+        """
+        Raise SchemaError unless the corpus was generated with these settings
+        """
+        settings = { 'rand_seed': rand_seed, 'test_edits': test_edits,
+                'dtype_err_quota': dtype_err_quota }
+        diffs = [ f'{k}={self.header.get(k)} (requested {v})'
+                for k, v in settings.items() if self.header.get(k) != v ]
+        if diffs:
+            raise SchemaError(
+                f'{type(self).__qualname__}: Corpus \'{self.path}\' was '
+                f'generated with {", ".join(diffs)}')
+
+    def get(self, test_id):
+        """
+        Return the test case with {test_id} as a map of arg_name => OpArg
+        """
+        if not 1 <= test_id <= self.num_cases:
+            raise SchemaError(
+                f'{type(self).__qualname__}: test id {test_id} out of range.  '
+                f'Corpus \'{self.path}\' has {self.num_cases} test cases')
+        self.idx_fh.seek((test_id - 1) * _OFFSET.size)
+        offset, = _OFFSET.unpack(self.idx_fh.read(_OFFSET.size))
+        self.data_fh.seek(offset)
+        rec = json.loads(self.data_fh.readline())
+        return { name: oparg.decode(enc) for name, enc in rec['args'].items() }
+
+    def __iter__(self):
+        """
+        Iterate over (test_id, op_args) pairs in test id order
+        """
+        for test_id in range(1, self.num_cases + 1):
+            yield test_id, self.get(test_id)
+
@@ -0,0 +1,165 @@
+"""
+On-disk cache of initialized OpSchema instances.
+
+A schema is stored right after OpSchema._init, under a key hashing the
+schema module source, the opschema sources and version, and the Python
+version.  Editing a schema file or upgrading opschema therefore never reuses
+a stale entry.
+
+Schema files register lambdas and local functions (directly, or inside
+Partial objects), which pickle cannot store by reference.  These are stored
+by value: their marshalled code, closure contents and defaults, with their
+globals taken from the module that defined them when loaded.
+"""
+import io
+import os
+import sys
+import types
+import pickle
+import marshal
+import hashlib
+import tempfile
+import importlib
+import importlib.util
+
+# bump to invalidate all entries when the storage format changes
+FORMAT = 1
+
+def _opschema_version():
+    try:
+        from .version import __version__
+        return __version__
+    except ImportError:
+        return 'unknown'
+
+def _core_hash():
+    # hash of the opschema sources, excluding the schema files
+    h = hashlib.blake2b(digest_size=16)
+    pkg_dir = os.path.dirname(__file__)
+    for name in sorted(os.listdir(pkg_dir)):
+        if name.endswith('.py'):
+            with open(os.path.join(pkg_dir, name), 'rb') as fh:
+                h.update(name.encode('utf-8'))
+                h.update(fh.read())
+    return h.hexdigest()
+
+_core = None
+
+def core_hash():
+    """
+    Hex digest of the opschema sources of this process, computed once
+    """
+    global _core
+    if _core is None:
+        _core = _core_hash()
+    return _core
+
+def cache_key(op_path):
+    """
+    Hex digest identifying the schema for {op_path} as currently defined
+    """
+    spec = importlib.util.find_spec(f'opschema.ops.{op_path}')
+    with open(spec.origin, 'rb') as fh:
+        source = fh.read()
+    h = hashlib.blake2b(digest_size=16)
+    for part in (str(FORMAT), sys.version, _opschema_version(), core_hash(),
+            op_path):
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    h.update(source)
+    return h.hexdigest()
+
+def _entry_path(cache_dir, op_path, key):
+    return os.path.join(cache_dir, f'{op_path}.{key}.pkl')
+
+class _EmptyCell(object):
+    """Stands in for the contents of an empty closure cell"""
+
+def _make_function(code_bytes, module, name, qualname, defaults, kwdefaults,
+        cell_vals):
+    code = marshal.loads(code_bytes)
+    func_globals = importlib.import_module(module).__dict__
+    closure = None
+    if cell_vals is not None:
+        closure = tuple(types.CellType() if v is _EmptyCell else types.CellType(v)
+                for v in cell_vals)
+    func = types.FunctionType(code, func_globals, name, defaults, closure)
+    func.__qualname__ = qualname
+    func.__kwdefaults__ = kwdefaults
+    return func
+
+def _importable(func):
+    # True if func can be pickled by reference
+    try:
+        obj = importlib.import_module(func.__module__)
+        for attr in func.__qualname__.split('.'):
+            obj = getattr(obj, attr)
+        return obj is func
+    except (ImportError, AttributeError, TypeError):
+        return False
+
+class _Pickler(pickle.Pickler):
+    def reducer_override(self, obj):
+        if not isinstance(obj, types.FunctionType) or _importable(obj):
+            return NotImplemented
+        cell_vals = None
+        if obj.__closure__ is not None:
+            cell_vals = []
+            for cell in obj.__closure__:
+                try:
+                    cell_vals.append(cell.cell_contents)
+                except ValueError:
+                    cell_vals.append(_EmptyCell)
+        args = (marshal.dumps(obj.__code__), obj.__module__, obj.__name__,
+                obj.__qualname__, obj.__defaults__, obj.__kwdefaults__,
+                cell_vals)
+        return _make_function, args
+
+def dumps(op):
+    buf = io.BytesIO()
+    _Pickler(buf, protocol=pickle.HIGHEST_PROTOCOL).dump(op)
+    return buf.getvalue()
+
+def load(cache_dir, op_path):
+    """
+    Return the cached OpSchema for {op_path}, or None if there is no valid
+    entry
+    """
+    path = _entry_path(cache_dir, op_path, cache_key(op_path))
+    try:
+        with open(path, 'rb') as fh:
+            return pickle.load(fh)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        # unreadable entry, for example from an interrupted write
+        return None
+
+def store(cache_dir, op):
+    """
+    Write initialized OpSchema {op} to {cache_dir}, replacing any entries for
+    older versions of its schema
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    key = cache_key(op.op_path)
+    data = dumps(op)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(data)
+        os.replace(tmp_path, _entry_path(cache_dir, op.op_path, key))
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    # remove entries for other versions of the schema
+    prefix = f'{op.op_path}.'
+    for name in os.listdir(cache_dir):
+        rest = name[len(prefix):]
+        if (not name.startswith(prefix) or not rest.endswith('.pkl') or
+                '.' in rest[:-4] or rest == f'{key}.pkl'):
+            continue
+        try:
+            os.remove(os.path.join(cache_dir, name))
+        except OSError:
+            pass
@@ -1,7 +1,28 @@
 import inspect
 import enum
+import heapq
+import hashlib
+import itertools
+from collections import Counter
+from contextlib import closing
+from random import Random
 from .error import SchemaError
+from .cache import LRUCache
 
+# node => profiler.Profiler recording its evaluations
+profilers = {}
+
+def set_profiler(nodes, prof):
+    """
+    Install {prof} (a profiler.Profiler, or None) as the profiler of {nodes},
+    returning the one previously installed for them
+    """
+    prev = None
+    for node in nodes:
+        prev = profilers.pop(node, None)
+        if prof is not None:
+            profilers[node] = prof
+    return prev
 
 """
 Usage:
@@ -47,6 +68,13 @@ class NodeFunc(object):
     def __call__(self):
         raise NotImplementedError
 
+    def lower_bound(self, *args, **kwargs):
+        """
+        A lower bound on the edit cost that __call__ will reserve when called
+        with the same arguments.  Must not modify any state.
+        """
+        return 0
+
 class FuncNode(object):
     """
     Represents a computation graph.  each instance wraps a NodeFunc.  Parent
@@ -75,6 +103,15 @@ class FuncNode(object):
         self.cached_val = None
         self.num_named_pars = num_named_pars
         self.vararg_type = vararg_type 
+        self.call_spec = None # see _compile_call
+        self.plans = None # GraphPlans kept by this node.  See compile_plan
+        self.version = 0 # incremented whenever an edge of the node is added
+
+    def __getstate__(self):
+        # plans are rebuilt on first use
+        state = self.__dict__.copy()
+        state['plans'] = None
+        return state
 
     def __repr__(self):
         return (f'{type(self).__name__}({self.used_name()})'
@@ -219,6 +256,9 @@ class FuncNode(object):
         self.children.append(node)
         node.parents.append(self)
         node.use_parent_subname.append(pass_subname)
+        node.call_spec = None
+        self.version += 1
+        node.version += 1
 
     def add_child(self, node):
         self._add_child(node, False)
@@ -230,6 +270,9 @@ class FuncNode(object):
         self.parents.append(node)
         self.use_parent_subname.append(pass_subname)
         node.children.append(self)
+        self.call_spec = None
+        self.version += 1
+        node.version += 1
 
     def append_parent(self, node):
         """
@@ -268,30 +311,59 @@ class FuncNode(object):
     def all_children(self):
         return self.children
 
-    def value(self):
+    def _compile_call(self):
         """
-        Evaluate the current node based on cached values of the parents
+        Freeze the argument layout of the node function into a call spec
+        (parents, num_named_pars, kwarg_names).  kwarg_names is the tuple of
+        keys for the parents passed to **kwargs, or None if the function takes
+        no **kwargs.
         """
-        z = zip(self.parents, self.use_parent_subname)
-        all_args = [(n.sub_name if s else n.name, n.get_cached()) for n,s in z]
-        pos_args = [v for n,v in all_args[:self.num_named_pars]]
-        if self.vararg_type == VarArgs.Positional:
-            args = tuple(v for n,v in all_args[self.num_named_pars:])
-            return self.func(*pos_args, *args)
-        elif self.vararg_type == VarArgs.Keyword:
-            kwargs = {}
-            for pos in range(self.num_named_pars, len(all_args)):
-                name, val = all_args[pos]
-                if name is None:
+        kwarg_names = None
+        if self.vararg_type == VarArgs.Keyword:
+            z = zip(self.parents, self.use_parent_subname)
+            names = [ n.sub_name if s else n.name for n, s in z ]
+            for pos in range(self.num_named_pars, len(names)):
+                if names[pos] is None:
                     pa = self.parents[pos]
                     raise SchemaError(
                         f'{self.__class__.__name__} \'{self.name}\' has '
                         f'arguments but parent {pos+1} '
                         f'({pa.name}) has no usable name')
-                kwargs[name] = val
-            return self.func(*pos_args, **kwargs)
-        else:
-            return self.func(*pos_args)
+            kwarg_names = tuple(names[self.num_named_pars:])
+        self.call_spec = (tuple(self.parents), self.num_named_pars,
+                kwarg_names)
+        return self.call_spec
+
+    def _call(self, func):
+        """
+        Call {func} with the cached values of the parents as arguments
+        """
+        parents, num_named, kwarg_names = (self.call_spec or
+                self._compile_call())
+        vals = [ pa.cached_val for pa in parents ]
+        if kwarg_names is None:
+            return func(*vals)
+        kwargs = dict(zip(kwarg_names, vals[num_named:]))
+        return func(*vals[:num_named], **kwargs)
+
+    def value(self):
+        """
+        Evaluate the current node based on cached values of the parents
+        """
+        return self._call(self.func)
+
+    def has_lower_bound(self):
+        """
+        True if the enclosed NodeFunc provides a lower_bound
+        """
+        return type(self.func).lower_bound is not NodeFunc.lower_bound
+
+    def lower_bound(self):
+        """
+        Lower bound on the edit cost reserved when evaluating the current node,
+        based on cached values of the parents
+        """
+        return self._call(self.func.lower_bound)
 
     def get_cached(self):
         """Retrieve the cached function evaluation value"""
@@ -312,19 +384,78 @@ def _topo_sort(nodes):
     """
     order = []
     todo = set(n.name for n in nodes)
-    # done = set()
-    def dfs(node):
-        if node.name not in todo:
-            return
-        todo.remove(node.name)
-        for ch in node.children:
-            dfs(ch)
-        order.append(node)
-    for n in sorted(nodes, key=lambda n: n.name):
-        dfs(n)
+    # depth first post-order over children, using an explicit stack
+    for root in sorted(nodes, key=lambda n: n.name):
+        if root.name not in todo:
+            continue
+        todo.remove(root.name)
+        stack = [(root, iter(root.children))]
+        while stack:
+            node, children = stack[-1]
+            for ch in children:
+                if ch.name in todo:
+                    todo.remove(ch.name)
+                    stack.append((ch, iter(ch.children)))
+                    break
+            else:
+                stack.pop()
+                order.append(node)
     topo_list = order[::-1]
     return topo_list
 
+class GraphPlan(object):
+    """
+    A graph evaluation frozen for a given set of live nodes and result nodes.
+    Holds the live nodes in topological order, and for each position the
+    index of its result slot (or -1), so that evaluations need not sort the
+    graph or search for result nodes again.
+    """
+    def __init__(self, live_nodes, result_nodes):
+        for rn in result_nodes:
+            if rn not in live_nodes:
+                raise RuntimeError(
+                    f'All nodes in result_nodes must be in live_nodes. Got '
+                    f'result node \'{rn.name}\'.  Available live_nodes are: '
+                    f'{", ".join(l.name for l in live_nodes)}')
+        self.nodes = _topo_sort(live_nodes)
+        self.num_nodes = len(self.nodes)
+        pos = { n: i for i, n in enumerate(self.nodes) }
+        self.res_pos = [ pos[r] for r in result_nodes ]
+        self.imap = [-1] * self.num_nodes
+        for ri, li in enumerate(self.res_pos):
+            self.imap[li] = ri
+        self.names = [ r.name for r in result_nodes ]
+        self.sub_names = [ r.sub_name for r in result_nodes ]
+        self.versions = self.node_versions()
+
+    def node_versions(self):
+        return tuple(n.version for n in self.nodes)
+
+# maximum number of GraphPlans kept by one node
+PLANS_PER_NODE = 64
+
+def compile_plan(live_nodes, result_nodes=()):
+    """
+    Return the GraphPlan for {live_nodes} and {result_nodes}, building it on
+    first use or if an edge has since been added to one of the live nodes.
+    The topological order depends only on the set of live nodes.
+
+    The plan is kept by the first result node (or else the first live node),
+    so that plans belong to the graph they were compiled from.
+    """
+    result_nodes = tuple(result_nodes)
+    owner = result_nodes[0] if result_nodes else next(iter(live_nodes), None)
+    if owner is None:
+        return GraphPlan(live_nodes, result_nodes)
+    if owner.plans is None:
+        owner.plans = LRUCache(PLANS_PER_NODE)
+    key = (frozenset(live_nodes), result_nodes)
+    plan = owner.plans.get(key)
+    if plan is None or plan.versions != plan.node_versions():
+        plan = GraphPlan(live_nodes, result_nodes)
+        owner.plans.put(key, plan)
+    return plan
+
 """
 Generation Graph API - a list-valued computation graph
 
@@ -351,6 +482,10 @@ class GenNode(FuncNode):
         super().__init__(*args)
 
     def values(self):
+        prof = profilers.get(self) if profilers else None
+        if prof is not None:
+            yield from prof.values(self)
+            return
         vals = super().value()
         yield from vals
         return
@@ -371,7 +506,19 @@ evaluation.  However, they must successfully evaluate before the node can
 evaluate.  This way, they enforce an evaluation order.
 
 Expect func to return a pair (success, value)
+
+Each call to pred_graph_evaluate opens a new evaluation epoch.  A node
+evaluated during an epoch records its outcome, so that shared ancestors are
+evaluated exactly once per epoch no matter how many descendants request them.
 """
+_epochs = itertools.count(1)
+
+def new_epoch():
+    """
+    Return a fresh epoch identifier for use with PredNode.evaluate
+    """
+    return next(_epochs)
+
 class PredNode(FuncNode):
     registry = {}
 
@@ -379,6 +526,8 @@ class PredNode(FuncNode):
         super().__init__(*args)
         self.pred_parents = []
         self.pred_children = []
+        self.epoch = None
+        self.success = None
 
     def add_predicate_parent(self, node):
         """
@@ -387,19 +536,38 @@ class PredNode(FuncNode):
         """
         self.pred_parents.append(node)
         node.pred_children.append(self)
+        self.version += 1
+        node.version += 1
 
-    def evaluate(self):
+    def evaluate(self, epoch):
         """
         Return whether this predicate (and all of its pre-requisites) passed.
+        The outcome is computed at most once per {epoch}.
         """
-        if not all(pp.evaluate() for pp in self.pred_parents):
-            return False
-        if not all(p.evaluate() for p in self.parents):
-            return False
-        success, value = self.value()
-        self.set_cached(value)
+        if self.epoch == epoch:
+            return self.success
+        if not all(pp.evaluate(epoch) for pp in self.pred_parents):
+            success = False
+        elif not all(p.evaluate(epoch) for p in self.parents):
+            success = False
+        elif profilers and self in profilers:
+            success, value = profilers[self].call(self)
+            self.set_cached(value)
+        else:
+            success, value = self.value()
+            self.set_cached(value)
+        self.epoch = epoch
+        self.success = success
         return success
 
+    def invalidate(self):
+        """
+        Forget the outcome of the current epoch, so that the next evaluate
+        call re-runs this node
+        """
+        self.epoch = None
+        self.success = None
+
     def all_children(self):
         return self.pred_children + self.children
 
@@ -425,6 +593,45 @@ def all_values(*nodes):
     results = [ tuple(c[n.name] for n in nodes) for c in config ]
     return results
 
+# returned by next() on an exhausted iterator in _depth_first
+_DONE = object()
+
+def _depth_first(num_nodes, open_values, set_value, exhausted=None):
+    """
+    Enumerate settings of {num_nodes} nodes depth first, using an explicit
+    stack of value iterators rather than nested generators.
+
+    open_values(i) returns an iterator over the values of node i, and is
+    called once nodes 0..i-1 are set.  set_value(i, val) records each value.
+    exhausted(i), if given, is called whenever the values of node i run out.
+    Yields (None) once per complete setting.
+    """
+    if num_nodes == 0:
+        yield
+        return
+    stack = [open_values(0)]
+    try:
+        while stack:
+            i = len(stack) - 1
+            val = next(stack[i], _DONE)
+            if val is _DONE:
+                if exhausted is not None:
+                    exhausted(i)
+                stack.pop()
+                continue
+            set_value(i, val)
+            if i + 1 == num_nodes:
+                yield
+            else:
+                stack.append(open_values(i + 1))
+    finally:
+        # close suspended value generators innermost first, so that any op
+        # state they hold is restored in order
+        while stack:
+            vals = stack.pop()
+            if hasattr(vals, 'close'):
+                vals.close()
+
 def gen_graph_iterate(nodes, full_name=True):
     """
     Produce all possible settings of the graph nodes as a generator of map
@@ -432,20 +639,15 @@ def gen_graph_iterate(nodes, full_name=True):
     name, otherwise use node.sub_name
     """
     # print('gen_graph_iterate: ', ','.join(n.name for n in visited_nodes))
-    topo_nodes = _topo_sort(nodes)
+    topo_nodes = compile_plan(nodes).nodes
+    names = [ n.name if full_name else n.sub_name for n in topo_nodes ]
     val_map = {}
-    def gen_rec(i):
-        if i == len(topo_nodes):
-            yield dict(val_map)
-            return
-        node = topo_nodes[i]
-        values = node.values()
-        for val in values:
-            node.set_cached(val)
-            name = node.name if full_name else node.sub_name
-            val_map[name] = val
-            yield from gen_rec(i+1)
-    yield from gen_rec(0)
+    def set_value(i, val):
+        topo_nodes[i].set_cached(val)
+        val_map[names[i]] = val
+    open_values = lambda i: topo_nodes[i].values()
+    for _ in _depth_first(len(topo_nodes), open_values, set_value):
+        yield val_map.copy()
 
 def _gen_graph(live_nodes, result_nodes, yield_map, full_name, op):
     """
@@ -453,31 +655,14 @@ def _gen_graph(live_nodes, result_nodes, yield_map, full_name, op):
     current values of result_nodes (which must be a subset of live_nodes)
     and yield as a tuple
     """
-    # map from li => ri
-    for rn in result_nodes:
-        if rn not in live_nodes:
-            raise RuntimeError(
-                f'All nodes in result_nodes must be in live_nodes. Got '
-                f'result node \'{rn.name}\'.  Available live_nodes are: '
-                f'{", ".join(l.name for l in live_nodes)}')
-
-    live_nodes = _topo_sort(live_nodes)
-    imap = [-1] * len(live_nodes)
-
-    for ri, r in enumerate(result_nodes):
-        li = live_nodes.index(r)
-        imap[li] = ri
-
+    plan = compile_plan(live_nodes, result_nodes)
+    live_nodes = plan.nodes
+    imap = plan.imap
     result = [None] * len(result_nodes)
-    res_names = [r.name if full_name else r.sub_name for r in result_nodes]
+    res_names = plan.names if full_name else plan.sub_names
+    result_map = dict.fromkeys(res_names)
 
-    def gen_rec(i):
-        if i == len(live_nodes):
-            if yield_map:
-                yield dict(zip(res_names, result))
-            else:
-                yield tuple(result) 
-            return
+    def open_values(i):
         node = live_nodes[i]
         values = node.values()
 
@@ -492,18 +677,366 @@ def _gen_graph(live_nodes, result_nodes, yield_map, full_name, op):
                         f'node_val: {pre_node.get_cached()} '
                         )
                 print(f'{indented_name:50s}{msg}')
+        return values
 
-        for val in values:
-            node.set_cached(val)
-            ri = imap[i]
-            if ri >= 0:
-                result[ri] = val
-            yield from gen_rec(i+1)
+    def set_value(i, val):
+        live_nodes[i].set_cached(val)
+        ri = imap[i]
+        if ri >= 0:
+            result[ri] = val
+            result_map[res_names[ri]] = val
+
+    def exhausted(i):
+        if op and op.show_graph_calls:
+            print(' ' * (i+1) + f'{live_nodes[i].name}  (no values)')
+
+    settings = _depth_first(len(live_nodes), open_values, set_value, 
+            exhausted)
+    for _ in settings:
+        if yield_map:
+            yield result_map.copy()
         else:
-            if op and op.show_graph_calls:
-                print(' ' * (i+1) + f'{node.name}  (no values)')
+            yield tuple(result) 
+
+def gen_graph_best_first(live_nodes, result_nodes, op):
+    """
+    Iterate over settings of live_nodes within the edit budget op.avail_edits
+    in order of increasing edit cost, yielding (cost, values) where values is
+    the tuple of values of result_nodes.
+
+    Partial settings are kept in a priority queue keyed on the cost reserved
+    so far plus the sum of NodeFunc.lower_bound for the not-yet-evaluated
+    nodes whose parents are all set.  Expanding a partial setting evaluates
+    the next node in topological order, measuring the cost each of its values
+    reserves via op.avail_edits.  Abandoning the iterator early skips the
+    rest of the search.
+
+    Queued settings share the values they have in common, so node functions
+    must not modify the values they receive from their parents.
+    """
+    plan = compile_plan(live_nodes, result_nodes)
+    live_nodes = plan.nodes
+    num_nodes = plan.num_nodes
+    res_pos = plan.res_pos
+
+    # ready[j] is the number of leading live nodes that must be set before
+    # node j can be evaluated
+    pos = { n.name: j for j, n in enumerate(live_nodes) }
+    ready = []
+    for node in live_nodes:
+        pas = [pos[pa.name] + 1 for pa in node.parents if pa.name in pos]
+        ready.append(max(pas, default=0))
+    bounded = [j for j, n in enumerate(live_nodes) if n.has_lower_bound()]
+
+    def heuristic(depth):
+        # call only when the first {depth} nodes hold their cached values 
+        return sum(live_nodes[j].lower_bound() for j in bounded 
+                if j >= depth and ready[j] <= depth)
+
+    budget = op.avail_edits
+    seq = itertools.count()
+    # entries are (cost + bound, -depth, seq, cost, values)
+    queue = [(heuristic(0), 0, next(seq), 0, ())]
+    try:
+        while queue:
+            _, neg_depth, _, cost, values = heapq.heappop(queue)
+            depth = -neg_depth
+            if depth == num_nodes:
+                yield cost, tuple(values[j] for j in res_pos)
+                continue
+
+            for node, val in zip(live_nodes, values):
+                node.set_cached(val)
+            node = live_nodes[depth]
+            avail = budget - cost
+            op.avail_edits = avail
+
+            if op.show_graph_calls:
+                indented_name = ' ' * depth + node.name
+                print(f'{indented_name:50s}cost: {cost} avail_edits: {avail}')
+
+            for val in node.values():
+                # edits reserved by node while yielding val
+                used = cost + avail - op.avail_edits
+                node.set_cached(val)
+                child_bound = used + heuristic(depth + 1)
+                if child_bound > budget:
+                    continue
+                entry = (child_bound, -(depth + 1), next(seq), used, 
+                        values + (val,))
+                heapq.heappush(queue, entry)
+    finally:
+        op.avail_edits = budget
+
+def canonical(val):
+    """
+    A string representation of {val} which is the same in every process.
+    (Unlike repr, set members are put in sorted order)
+    """
+    if isinstance(val, dict):
+        items = ', '.join(f'{canonical(k)}: {canonical(v)}' 
+                for k, v in val.items())
+        return f'{{{items}}}'
+    elif isinstance(val, (set, frozenset)):
+        items = ', '.join(sorted(canonical(v) for v in val))
+        return f'{{{items}}}'
+    elif isinstance(val, (list, tuple)):
+        items = ', '.join(canonical(v) for v in val)
+        return f'[{items}]' if isinstance(val, list) else f'({items})'
+    else:
+        return repr(val)
+
+def _push_filters(nodes):
+    """
+    Reorder topologically sorted {nodes} so that each node whose func has the
+    is_filter attribute (and so may yield nothing) comes directly after its
+    last parent, pruning dead settings as early as possible.  The relative
+    order of the other nodes is kept.
+    """
+    order = list(nodes)
+    for node in nodes:
+        if not getattr(node.func, 'is_filter', False):
+            continue
+        order.remove(node)
+        names = [ n.name for n in order ]
+        last = max((names.index(pa.name) for pa in node.parents 
+            if pa.name in names), default=-1)
+        order.insert(last + 1, node)
+    return order
+
+class GenGraphIndex(object):
+    """
+    Deterministic enumeration of the settings of a generation graph, with
+    random access by position.
+
+    While a node whose func has the uses_rng attribute is producing values,
+    op.gen_rng is replaced by a random number generator seeded from {seed},
+    the node name and the node's input values.  The values of a node then
+    depend only on its inputs and on {state_func}(), which must return a
+    hashable summary of any other op state the nodes consult (such as an
+    edit budget).
+
+    As a result, the number of settings below a given node position depends
+    only on the values of the 'frontier' nodes (the already set parents of
+    the remaining nodes) and on the op state.  These counts are memoized,
+    so that after the first count, setting N is found by descending through
+    the graph skipping over whole subtrees, rather than enumerating the N-1
+    settings before it.
+    """
+    def __init__(self, live_nodes, result_nodes, op, seed, state_func,
+            set_state_func=None, cache_size=1000):
+        self.nodes = _push_filters(_topo_sort(live_nodes))
+        self.res_pos = [ self.nodes.index(r) for r in result_nodes ]
+        self.op = op
+        self.seed = seed
+        self.state_func = state_func
+        self.set_state_func = set_state_func
+        self.count_memo = {}
+
+        # (position, inputs, state) => [(value, state), ...] for nodes with
+        # func.cache_values.  Only used if set_state_func is given
+        self.value_cache = LRUCache(cache_size)
+        self.tally_memo = {} # label_func => memo of _tally
+
+        # frontier[i] = positions j < i whose values are used by a node >= i
+        pos = { n.name: j for j, n in enumerate(self.nodes) }
+        self.frontier = []
+        for i in range(len(self.nodes) + 1):
+            used = { pos[pa.name] for n in self.nodes[i:] for pa in n.parents
+                    if pa.name in pos and pos[pa.name] < i }
+            self.frontier.append(sorted(used))
+
+    def _rng(self, node):
+        inputs = ', '.join(canonical(pa.get_cached()) for pa in node.parents)
+        key = f'{self.seed}|{node.name}|{inputs}'.encode('utf-8')
+        digest = hashlib.blake2b(key, digest_size=8).digest()
+        return Random(int.from_bytes(digest, 'little'))
+
+    def _values(self, i):
+        """
+        Generate the values of node i.  Since these depend only on the inputs
+        and op state, the values of a node with func.cache_values are
+        recorded together with the op state at each value, and replayed for
+        the same inputs and state.
+        """
+        node = self.nodes[i]
+        if (self.set_state_func is None or 
+                not getattr(node.func, 'cache_values', False)):
+            yield from self._node_values(i)
+            return
 
-    yield from gen_rec(0)
+        inputs = tuple(canonical(pa.get_cached()) for pa in node.parents)
+        key = (i, inputs, self.state_func())
+        entries = self.value_cache.get(key)
+        if entries is None:
+            entries = []
+            with closing(self._node_values(i)) as vals:
+                for val in vals:
+                    entries.append((val, self.state_func()))
+                    yield val
+            # only reached if all values were produced
+            self.value_cache.put(key, entries)
+            return
+
+        saved_state = self.state_func()
+        try:
+            for val, state in entries:
+                self.set_state_func(state)
+                yield val
+        finally:
+            self.set_state_func(saved_state)
+
+    def _node_values(self, i):
+        """
+        Generate the values of node i with its own random number generator
+        """
+        node = self.nodes[i]
+        if not getattr(node.func, 'uses_rng', False):
+            yield from node.values()
+            return
+        rng = self._rng(node)
+        with closing(node.values()) as vals:
+            while True:
+                saved_rng = self.op.gen_rng
+                self.op.gen_rng = rng
+                try:
+                    val = next(vals)
+                except StopIteration:
+                    return
+                finally:
+                    self.op.gen_rng = saved_rng
+                yield val
+
+    def _result(self):
+        return tuple(self.nodes[j].get_cached() for j in self.res_pos)
+
+    def __iter__(self):
+        """
+        Iterate over all settings in order, yielding the tuple of values of
+        result_nodes
+        """
+        def set_value(i, val):
+            self.nodes[i].set_cached(val)
+        for _ in _depth_first(len(self.nodes), self._values, set_value):
+            yield self._result()
+
+    def _count(self, i, cap=None):
+        """
+        Number of settings of nodes i, i+1, ..., given the current values of
+        nodes before i.  If {cap} is given, counting may stop early once the
+        number reaches {cap}, returning a number >= {cap}.  Only exact counts
+        are memoized.
+        """
+        if i == len(self.nodes):
+            return 1
+        frontier = tuple(canonical(self.nodes[j].get_cached()) 
+                for j in self.frontier[i])
+        key = (i, frontier, self.state_func())
+        num = self.count_memo.get(key, None)
+        if num is not None:
+            return num
+        num = 0
+        with closing(self._values(i)) as vals:
+            for val in vals:
+                self.nodes[i].set_cached(val)
+                sub_cap = None if cap is None else cap - num
+                num += self._count(i+1, sub_cap)
+                if cap is not None and num >= cap:
+                    return num
+        self.count_memo[key] = num
+        return num
+
+    def count(self):
+        """
+        Total number of settings
+        """
+        return self._count(0)
+
+    def _tally(self, i, label_func, memo):
+        if i == len(self.nodes):
+            return Counter({ (): 1 })
+        frontier = tuple(canonical(self.nodes[j].get_cached()) 
+                for j in self.frontier[i])
+        key = (i, frontier, self.state_func())
+        tally = memo.get(key, None)
+        if tally is not None:
+            return tally
+        node = self.nodes[i]
+        state = self.state_func()
+        tally = Counter()
+        for val in self._values(i):
+            node.set_cached(val)
+            labels = label_func(node, val, state)
+            for sub_labels, num in self._tally(i+1, label_func, memo).items():
+                tally[labels + sub_labels] += num
+        memo[key] = tally
+        self.count_memo[key] = sum(tally.values())
+        return tally
+
+    def tally(self, label_func):
+        """
+        Count settings broken down by label.  {label_func}(node, value, state)
+        is called for each value a node produces, while the node is still
+        producing it, with {state} the value of state_func() before the node
+        started.  It returns a tuple of hashable labels.  Returns a Counter
+        mapping the concatenation of labels along each setting (in node order)
+        to the number of such settings.
+        """
+        memo = self.tally_memo.setdefault(label_func, {})
+        return self._tally(0, label_func, memo)
+
+    def get_matching(self, index, label_func, accept):
+        """
+        Find the setting at zero-based {index} among those settings whose
+        labels (see tally) satisfy {accept}(labels).  Returns the pair
+        (position, result) where position is its index in the enumeration
+        order and result the tuple of values of result_nodes.  Raises
+        IndexError if out of range.
+        """
+        memo = self.tally_memo.setdefault(label_func, {})
+        def find(i, index, labels, pos):
+            if i == len(self.nodes):
+                return pos, self._result()
+            node = self.nodes[i]
+            state = self.state_func()
+            with closing(self._values(i)) as vals:
+                for val in vals:
+                    node.set_cached(val)
+                    val_labels = labels + label_func(node, val, state)
+                    sub = self._tally(i+1, label_func, memo)
+                    num = sum(n for sub_labels, n in sub.items() 
+                            if accept(val_labels + sub_labels))
+                    if index < num:
+                        return find(i+1, index, val_labels, pos)
+                    index -= num
+                    pos += sum(sub.values())
+            raise IndexError(f'Setting index out of range')
+        if index < 0:
+            raise IndexError(f'Setting index out of range')
+        return find(0, index, (), 0)
+
+    def get(self, index):
+        """
+        Return the tuple of values of result_nodes for the setting at
+        zero-based {index} in the enumeration order.  Raises IndexError if
+        out of range.
+        """
+        def find(i, index):
+            if i == len(self.nodes):
+                return self._result()
+            # the generators along the path stay suspended until the result
+            # is found, so that op state they set remains in effect
+            with closing(self._values(i)) as vals:
+                for val in vals:
+                    self.nodes[i].set_cached(val)
+                    num = self._count(i+1, index + 1)
+                    if index < num:
+                        return find(i+1, index)
+                    index -= num
+            raise IndexError(f'Setting index out of range')
+        if index < 0:
+            raise IndexError(f'Setting index out of range')
+        return find(0, index)
 
 def gen_graph_values(live_nodes, result_nodes, op=None):
     """
@@ -520,14 +1053,19 @@ def gen_graph_map(live_nodes, result_nodes, full_name=True, op=None):
     """
     return _gen_graph(live_nodes, result_nodes, True, full_name, op)
 
-def pred_graph_evaluate(*nodes):
+def pred_graph_evaluate(*nodes, epoch=None):
     """
     Evaluate PredNodes in dependency order until a predicate fails.
     If any predicate fails, return its value.  Otherwise, return None
+
+    Each node is evaluated at most once within {epoch}.  If {epoch} is None, a
+    new epoch is started.
     """
-    topo_nodes = _topo_sort(nodes)
+    if epoch is None:
+        epoch = new_epoch()
+    topo_nodes = compile_plan(nodes).nodes
     for n in topo_nodes:
-        if not n.evaluate():
+        if not n.evaluate(epoch):
             return n.get_cached()
     return None
 
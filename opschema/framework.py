@@ -0,0 +1,49 @@
+import sys
+import importlib
+
+"""
+Deferred import of the framework.  Building schemas, explaining them and
+generating test configurations never touch a tensor, so the framework module
+is only imported on first attribute access of its stand-in, for example when
+a tensor is created or an argument is checked.
+"""
+
+# framework prefix used in op paths => module name
+MODULES = { 'tf': 'tensorflow' }
+
+class LazyModule(object):
+    """
+    Stand-in for the module {name}, importing it on first attribute access
+    """
+    def __init__(self, name):
+        self._name = name
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self._name})'
+
+    def __getattr__(self, attr):
+        return getattr(importlib.import_module(self._name), attr)
+
+tf = LazyModule('tensorflow')
+
+def get_module(prefix):
+    """
+    Import and return the framework module for op path prefix {prefix}
+    """
+    return importlib.import_module(MODULES[prefix])
+
+def resolve(op_path):
+    """
+    Import the framework and return the function at {op_path}
+    """
+    prefix, path = op_path.split('.', 1)
+    func = get_module(prefix)
+    for attr in path.split('.'):
+        func = getattr(func, attr)
+    return func
+
+def is_loaded(prefix='tf'):
+    """
+    True if the framework for {prefix} has been imported
+    """
+    return MODULES[prefix] in sys.modules
@@ -40,6 +40,17 @@ class GenFunc(NodeFunc):
     """
     A NodeFunc outfitted with 'kinds' to signal which of four roles it plays
     """
+    # the kind of edit the node makes when it uses reserve_edit
+    edit_kind = None
+
+    # if True, fgraph.GenGraphIndex replays the recorded values of the node
+    # for inputs it has already seen, rather than calling it again
+    cache_values = False
+
+    # whether the node draws from op.gen_rng.  fgraph.GenGraphIndex gives
+    # only these nodes a random number generator of their own
+    uses_rng = False
+
     def __init__(self, op, name=None):
         super().__init__(name)
         self.op = op
@@ -164,7 +175,14 @@ class GenDims(NodeFunc):
             fgen = self.fill(gen)
             gens.append(fgen)
         
-        pgen = itertools.product(*gens)
+        if self.op.cover_strength is None:
+            pgen = itertools.product(*gens)
+        else:
+            comp_lists = [ list(g) for g in gens ]
+            sizes = [ len(l) for l in comp_lists ]
+            rows = base.covering_array(sizes, self.op.cover_strength)
+            pgen = (tuple(l[i] for l, i in zip(comp_lists, row)) 
+                    for row in rows)
         yield from self.gen_dims(pgen)
 
 class CompDims(NodeFunc):
@@ -417,27 +435,60 @@ class ArgRanks(GenFunc):
 class ArgIndels(GenFunc):
     """
     In Test mode:
+
+    Indels leaving argument ranks which fail any of the rank filters (see
+    add_rank_filter) are not yielded.
     """
+    edit_kind = 'indel'
+    uses_rng = True
+
     def __init__(self, op):
         super().__init__(op)
+        self.rank_filters = []
+
+    def add_rank_filter(self, func):
+        """
+        Add a condition func(arg_ranks) on the argument ranks after the indel,
+        which must hold for any test to be generated downstream
+        """
+        self.rank_filters.append(func)
+
+    def passes(self, arg_ranks, indels):
+        if len(self.rank_filters) == 0:
+            return True
+        mut_ranks = dict(arg_ranks)
+        for arg, (kind, *rest) in indels.items():
+            if kind == Indel.Insert:
+                _, size = rest
+                mut_ranks[arg] += size
+            else:
+                beg, end = rest
+                mut_ranks[arg] -= end - beg
+        return all(f(mut_ranks) for f in self.rank_filters)
 
     def __call__(self, arg_ranks):
-        yield {}
+        if self.passes(arg_ranks, {}):
+            yield {}
         num_yielded = 1
-        # produce each type of indel up to a limit
+        # produce each type of indel up to a limit.  Filtered indels are still
+        # counted and drawn, so that the remaining ones are unchanged
         with self.reserve_edit(1) as avail:
             if not avail:
                 return
             for arg, rank in sorted(arg_ranks.items()):
                 pos = self.op.gen_rng.choice(range(rank+1))
-                yield { arg: (Indel.Insert, pos, 1) }
+                indels = { arg: (Indel.Insert, pos, 1) }
+                if self.passes(arg_ranks, indels):
+                    yield indels
                 num_yielded += 1
                 if num_yielded == self.op.max_yield_count:
                     break
                 if rank == 0:
                     break
                 pos = self.op.gen_rng.choice(range(rank))
-                yield { arg: (Indel.Delete, pos, pos+1) }
+                indels = { arg: (Indel.Delete, pos, pos+1) }
+                if self.passes(arg_ranks, indels):
+                    yield indels
                 num_yielded += 1
                 if num_yielded == self.op.max_yield_count:
                     break
@@ -449,6 +500,10 @@ class ArgMutations(GenFunc):
     single-index argument signatures, shape may be an integer, indicating
     rank-agnostic broadcasting shape.  Otherwise, shape is an integer list.
     """
+    edit_kind = 'mutation'
+    uses_rng = True
+    cache_values = True
+
     def __init__(self, op):
         super().__init__(op)
 
@@ -562,6 +617,8 @@ class DataFormat(GenFunc):
     Generate the special data_format argument, defined by the 'layout' API call
     Inference: yields None or ValueEdit
     """
+    edit_kind = 'data_format'
+
     def __init__(self, op, formats, arg_name, rank_idx):
         super().__init__(op, arg_name)
         self.formats = formats
@@ -588,6 +645,9 @@ class DTypeIndiv(GenFunc):
     Generates all valid dtypes for {arg_name}, which has been declared with 
     API call valid_dtypes.  Generates up to op.max_gen_invalid_dtypes ones
     """
+    edit_kind = 'dtype'
+    uses_rng = True
+
     def __init__(self, op, arg_name):
         super().__init__(op, arg_name)
         self.arg_name = arg_name
@@ -608,6 +668,9 @@ class DTypeEquate(GenFunc):
     A DType which is declared equal to another using equate_dtypes 
     Inference: yields None or a DTypesEdit
     """
+    edit_kind = 'dtype'
+    uses_rng = True
+
     def __init__(self, op, arg_name):
         super().__init__(op, arg_name)
         self.arg_name = arg_name
@@ -630,6 +693,10 @@ class DTypesNotImpl(GenFunc):
     function exclude_combos
     Inference: yields None or DTypesNotImpl
     """
+    edit_kind = 'dtype_combo'
+
+    is_filter = True
+
     def __init__(self, op):
         super().__init__(op)
         self.rules = self.op.dtype_rules
@@ -662,10 +729,18 @@ class ShapeInt(NodeFunc):
     Produce an integer value representing the shape of arg_name.  Returns the
     empty list if the shape is inconsistent with a non-broadcasted integer.
     """
+    is_filter = True
+
     def __init__(self, arg_name):
         super().__init__(arg_name)
         self.arg_name = arg_name
 
+    def ranks_ok(self, arg_ranks):
+        """
+        The rank condition for this node to produce a value
+        """
+        return arg_ranks.get(self.arg_name, 1) == 1
+
     def __call__(self, arg_shapes):
         shape = arg_shapes[self.arg_name]
         if len(shape) != 1:
@@ -708,11 +783,20 @@ class ShapeTensor2D(NodeFunc):
     impossible to have input with non-rectangular shape, this node will produce
     no output if shape is non-rectangular.
     """
+    is_filter = True
+
     def __init__(self, arg_name, num_rows):
         super().__init__(arg_name)
         self.arg_name = arg_name
         self.num_rows = num_rows
 
+    def ranks_ok(self, arg_ranks):
+        """
+        The rank condition for this node to produce a value
+        """
+        names = [ f'{self.arg_name}.{i}' for i in range(self.num_rows) ]
+        return len({ arg_ranks[n] for n in names if n in arg_ranks }) <= 1
+
     def __call__(self, arg_shapes):
         names = [ f'{self.arg_name}.{i}' for i in range(self.num_rows) ]
         rows = [ arg_shapes[n] for n in names ]
@@ -737,6 +821,8 @@ class RankInt(NodeFunc):
         yield arg
         
 class Int(GenFunc):
+    uses_rng = True
+
     def __init__(self, op, lo, hi):
         super().__init__(f'{lo}-{hi}')
         self.op = op
@@ -757,6 +843,8 @@ class Options(GenFunc):
     """
     Represent a specific set of options known at construction time
     """
+    edit_kind = 'option'
+
     def __init__(self, op, name, options):
         super().__init__(op, name)
         self.arg_name = name
@@ -1,6 +1,7 @@
 import itertools
 import copy
 import numpy as np
+from collections import Counter
 from contextlib import contextmanager
 from .fgraph import NodeFunc
 from .base import ALL_DTYPES, INDEX_RANKS, LAYOUT
@@ -15,6 +16,72 @@ job is to ingest the arguments provided by the op, which are delivered via the
 ObservedValue nodes.
 
 """
+def rank_bounds(op, layout, obs_shapes, obs_args, slack):
+    """
+    Bound the rank of each primary index by interval propagation over the
+    schema rank constraints and the observed shapes, assuming {layout}.  The
+    rank of each observed shape may differ by at most {slack} from that
+    implied by its signature.  Returns a map of pri_idx => (lo, hi), or None
+    if the constraints cannot be satisfied.
+    """
+    pri_idxs = [ idx for idx, ind in op.index.items() if ind.primary() ]
+
+    rows = [] # (sig, lo, hi), expressing RANK(sig) in [lo, hi]
+    seen = set()
+    for pri_idx in pri_idxs:
+        func = op.inf_graph[pri_idx].func
+        if not isinstance(func, RankRange):
+            continue
+        for cons in func.schema_cons:
+            if id(cons) not in seen:
+                seen.add(id(cons))
+                rows.append((cons.sig, cons.lo, cons.hi))
+        for cons in func.obs_shapes_cons:
+            rank = cons.func(obs_shapes[cons.shape_arg])
+            if rank is None:
+                return None
+            rows.append((cons.sig, rank, rank))
+        for cons in func.obs_args_cons:
+            rank = obs_args[cons.arg]
+            rows.append((cons.sig, rank, rank))
+
+    # the same rank implications that ArgIndels checks
+    sigmap_node = op._inf_node(ge.SigMap)
+    for sig_node in sigmap_node.parents:
+        arg = sig_node.sub_name
+        obs_shape = obs_shapes.get(arg, None)
+        if obs_shape is None or isinstance(obs_shape, int):
+            continue
+        obs_rank = len(obs_shape)
+        sig = sig_node.func.sigs[layout]
+        rows.append((sig, max(0, obs_rank - slack), obs_rank + slack))
+
+    bounds = { idx: (0, RankRange.MAX_RANK) for idx in pri_idxs }
+    rows = [ (Counter(op.index[idx].pri_idx for idx in sig), lo, hi) 
+            for sig, lo, hi in rows ]
+
+    # each pass can only shrink the intervals.  the pass limit guards against
+    # slow convergence, and any intermediate result is still a valid bound
+    for _ in range(100):
+        changed = False
+        for coeffs, lo, hi in rows:
+            for idx, c in coeffs.items():
+                rest_lo = sum(n * bounds[i][0] for i, n in coeffs.items()
+                        if i != idx)
+                rest_hi = sum(n * bounds[i][1] for i, n in coeffs.items()
+                        if i != idx)
+                cur_lo, cur_hi = bounds[idx]
+                new_lo = max(cur_lo, -((rest_hi - lo) // c))
+                new_hi = min(cur_hi, (hi - rest_lo) // c)
+                if new_lo > new_hi:
+                    return None
+                if (new_lo, new_hi) != (cur_lo, cur_hi):
+                    bounds[idx] = (new_lo, new_hi)
+                    changed = True
+        if not changed:
+            break
+    return bounds
+
 class ReportNodeFunc(NodeFunc):
     """
     NodeFunc which further implements user-facing reporting functions
@@ -62,8 +129,11 @@ class Layout(NodeFunc):
 class RankRange(ReportNodeFunc):
     """
     Produce a range of all valid ranks of a primary index.  'Valid' means
-    obeying all schema constraints and observation constraints.
+    obeying all schema constraints and observation constraints, and lying
+    within op.rank_bounds if set.
     """
+    MAX_RANK = 100000
+
     def __init__(self, op, name):
         super().__init__(op, name)
         self.schema_cons = []
@@ -101,7 +171,10 @@ class RankRange(ReportNodeFunc):
         index_ranks = kwargs
         
         # Get the initial bounds consistent with the schema
-        sch_lo, sch_hi = 0, 100000
+        sch_lo, sch_hi = 0, self.MAX_RANK
+        if self.op.rank_bounds is not None:
+            sch_lo, sch_hi = self.op.rank_bounds[self.sub_name]
+
         for cons in self.schema_cons:
             clo, chi = cons(**index_ranks)
             sch_lo = max(sch_lo, clo)
@@ -157,18 +230,17 @@ class ArgIndels(ReportNodeFunc):
     def __init__(self, op):
         super().__init__(op)
 
-    def __call__(self, index_ranks, sigs, obs_shapes, layout):
-        arg_ranks = {}
-        for arg, sig in sigs.items():
-            rank = sum(index_ranks[idx] for idx in sig)
-            arg_ranks[arg] = rank
+    def _arg_delta(self, index_ranks, sigs, obs_shapes):
         """
         Produces instructions to insert part of an index's dimensions, or
         delete a subrange from a shape.  
         """
-        arg_delta = {}
-        edit = base.ShapeEdit(self.op, index_ranks, sigs, layout)
+        arg_ranks = {}
+        for arg, sig in sigs.items():
+            rank = sum(index_ranks[idx] for idx in sig)
+            arg_ranks[arg] = rank
 
+        arg_delta = {}
         for arg, rank in arg_ranks.items():
             if arg not in obs_shapes:
                 continue
@@ -186,7 +258,16 @@ class ArgIndels(ReportNodeFunc):
 
             else:
                 arg_delta[arg] = delta
+        return arg_delta
 
+    def lower_bound(self, index_ranks, sigs, obs_shapes, layout):
+        # exact, the same as ShapeEdit.indel_cost
+        arg_delta = self._arg_delta(index_ranks, sigs, obs_shapes)
+        return sum(abs(d) + 1 for d in arg_delta.values())
+
+    def __call__(self, index_ranks, sigs, obs_shapes, layout):
+        edit = base.ShapeEdit(self.op, index_ranks, sigs, layout)
+        arg_delta = self._arg_delta(index_ranks, sigs, obs_shapes)
         edit.add_indels(arg_delta)
         with self.reserve_edit(edit.cost()) as avail: 
             if avail:
@@ -200,15 +281,8 @@ class IndexUsage(ReportNodeFunc):
     def __init__(self, op):
         super().__init__(op)
 
-    def __call__(self, index_ranks, shape_edit, obs_shapes):
-        # compute idx usage
-        # if indels are present, pass-through
-        if shape_edit.indel_cost() != 0:
-            yield shape_edit
-            return
-
+    def _usage_map(self, index_ranks, sigs, obs_shapes):
         usage_map = {} # idx => (dims => [arg1, ...]) 
-        sigs = shape_edit.arg_sigs
         for arg, obs_shape in obs_shapes.items():
             sig = sigs[arg]
             if isinstance(obs_shape, int):
@@ -225,6 +299,28 @@ class IndexUsage(ReportNodeFunc):
                     args = usage.setdefault(dims, set())
                     args.add(arg)
                     off += index_ranks[idx]
+        return usage_map
+
+    def lower_bound(self, index_ranks, shape_edit, obs_shapes):
+        # exact, the same as ShapeEdit.idx_usage_cost
+        if shape_edit.indel_cost() != 0:
+            return 0
+        usage_map = self._usage_map(index_ranks, shape_edit.arg_sigs,
+                obs_shapes)
+        return sum(len(u) - 1 for u in usage_map.values())
+
+    def __call__(self, index_ranks, shape_edit, obs_shapes):
+        # compute idx usage
+        # if indels are present, pass-through
+        if shape_edit.indel_cost() != 0:
+            yield shape_edit
+            return
+
+        usage_map = self._usage_map(index_ranks, shape_edit.arg_sigs,
+                obs_shapes)
+        # the received edit may be shared with other settings queued by
+        # fgraph.gen_graph_best_first, so annotate a copy
+        shape_edit = copy.copy(shape_edit)
         shape_edit.add_idx_usage(usage_map)
         with self.reserve_edit(shape_edit.cost()) as avail:
             if avail:
@@ -253,6 +349,8 @@ class IndexConstraints(ReportNodeFunc):
 
         input_dims = shape_edit.get_input_dims(use_scalars=True)
         comp_dims = self.render.get_dims(input_dims)
+        # annotate a copy, as in IndexUsage
+        shape_edit = copy.copy(shape_edit)
         shape_edit.add_comp_dims(comp_dims)
         
         formulas = self.render.formula_map(input_dims)
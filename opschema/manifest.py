@@ -0,0 +1,64 @@
+import os
+import inspect
+import importlib
+
+"""
+Parameter names of the framework op of each schema under opschema/ops, so
+that schemas can be built without importing the framework.  The signatures
+are those of the framework version the file was generated with, so they are
+only used while the framework is not imported, and are checked against the
+framework op once it is (see OpSchema.func_sig).  This file is generated.
+After adding a schema or upgrading the framework, regenerate it with:
+
+    python -m opschema.manifest
+"""
+
+SIGNATURES = {
+    'tf.gather_nd': ('params', 'indices', 'batch_dims', 'name', 'bad_indices_policy'),
+    'tf.nn.atrous_conv2d': ('value', 'filters', 'rate', 'padding', 'name'),
+    'tf.nn.atrous_conv2d_transpose': ('value', 'filters', 'output_shape', 'rate', 'padding', 'name'),
+    'tf.nn.avg_pool': ('input', 'ksize', 'strides', 'padding', 'data_format', 'name'),
+    'tf.nn.bias_add': ('value', 'bias', 'data_format', 'name'),
+    'tf.nn.conv_transpose': ('input', 'filters', 'output_shape', 'strides', 'padding', 'data_format', 'dilations', 'name'),
+    'tf.nn.convolution': ('input', 'filters', 'strides', 'padding', 'data_format', 'dilations', 'name'),
+    'tf.nn.depth_to_space': ('input', 'block_size', 'data_format', 'name'),
+    'tf.nn.separable_conv2d': ('input', 'depthwise_filter', 'pointwise_filter', 'strides', 'padding', 'data_format', 'dilations', 'name'),
+    'tf.nn.space_to_batch': ('input', 'block_shape', 'paddings', 'name'),
+    'tf.nn.space_to_depth': ('input', 'block_size', 'data_format', 'name'),
+    'tf.raw_ops.LSTMBlockCell': ('x', 'cs_prev', 'h_prev', 'w', 'wci', 'wcf', 'wco', 'b', 'forget_bias', 'cell_clip', 'use_peephole', 'name'),
+    'tf.scatter_nd': ('indices', 'updates', 'shape', 'bad_indices_policy', 'name'),
+}
+
+def build():
+    """
+    Return op_path => tuple of parameter names for every schema module,
+    resolving each framework op
+    """
+    from pkgutil import walk_packages
+    from . import ops, framework
+    modinfos = walk_packages(ops.__path__, ops.__name__ + '.')
+    op_paths = sorted(mi.name.split('.',2)[2] for mi in modinfos 
+            if not mi.ispkg)
+    sigs = {}
+    for op_path in op_paths:
+        func = framework.resolve(op_path)
+        sigs[op_path] = tuple(inspect.signature(func).parameters.keys())
+    return sigs
+
+def write(path=None):
+    """
+    Regenerate this file
+    """
+    if path is None:
+        path = __file__
+    with open(path) as fh:
+        source = fh.read()
+    head, rest = source.split('SIGNATURES = {\n', 1)
+    tail = rest.split('}\n', 1)[1]
+    items = ''.join(f'    {op_path!r}: {params!r},\n' 
+            for op_path, params in build().items())
+    with open(path, 'w') as fh:
+        fh.write(head + 'SIGNATURES = {\n' + items + '}\n' + tail)
+
+if __name__ == '__main__':
+    write()
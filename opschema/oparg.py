@@ -3,9 +3,48 @@ Subclasses of OpArg - a class for representing arguments to the op, which are
 returned by certain nodes of gen_graph
 """
 import numpy as np
-import tensorflow as tf
+from .framework import tf
 from .error import SchemaError
 
+def _to_json(val):
+    # tuples are tagged so that decoding restores them
+    if isinstance(val, tuple):
+        return { 'tuple': [ _to_json(v) for v in val ] }
+    elif isinstance(val, list):
+        return [ _to_json(v) for v in val ]
+    elif isinstance(val, np.integer):
+        return int(val)
+    elif isinstance(val, np.floating):
+        return float(val)
+    else:
+        return val
+
+def _from_json(val):
+    if isinstance(val, dict):
+        return tuple(_from_json(v) for v in val['tuple'])
+    elif isinstance(val, list):
+        return [ _from_json(v) for v in val ]
+    else:
+        return val
+
+def _freeze(val):
+    # hashable form of a _to_json result
+    if isinstance(val, dict):
+        return 'tuple', _freeze(val['tuple'])
+    elif isinstance(val, list):
+        return tuple(_freeze(v) for v in val)
+    else:
+        return val
+
+def decode(obj):
+    """
+    Construct an OpArg from the result of OpArg.encode()
+    """
+    cls = globals().get(obj['type'], None)
+    if not (isinstance(cls, type) and issubclass(cls, OpArg)):
+        raise SchemaError(f'Cannot decode unknown OpArg type \'{obj["type"]}\'')
+    return cls(*_from_json(obj['args']))
+
 class OpArg(object):
     def __init__(self, *args):
         pass
@@ -22,6 +61,26 @@ class OpArg(object):
         """
         raise NotImplementedError
 
+    def ctor_args(self):
+        """
+        The arguments to the constructor which would reproduce this OpArg
+        """
+        raise NotImplementedError
+
+    def encode(self):
+        """
+        Produce a JSON-serializable representation.  Inverse of decode()
+        """
+        return { 'type': type(self).__name__, 
+                'args': _to_json(list(self.ctor_args())) }
+
+    def signature(self):
+        """
+        A hashable summary of the type and constructor arguments.  OpArgs
+        with equal signatures give the op equivalent inputs.
+        """
+        return type(self).__name__, _freeze(_to_json(list(self.ctor_args())))
+
 class DataTensorArg(OpArg):
     """
     An OpArg produced by ge.DataTensor 
@@ -33,13 +92,20 @@ class DataTensorArg(OpArg):
             raise SchemaError(f'Shape \'{shape}\' has {nelem} elements, '
                     f'which exceeds 1e8 elements')
         self.shape = shape
-        self.dtype = tf.dtypes.as_dtype(dtype_name)
+        self.dtype_name = dtype_name
+
+    @property
+    def dtype(self):
+        return tf.dtypes.as_dtype(self.dtype_name)
 
     def __repr__(self):
-        return f'{self.__class__.__name__}({self.shape}:{self.dtype.name})'
+        return f'{self.__class__.__name__}({self.shape}:{self.dtype_name})'
 
     def __str__(self):
-        return f'{self.shape}:{self.dtype.name}'
+        return f'{self.shape}:{self.dtype_name}'
+
+    def ctor_args(self):
+        return self.shape, self.dtype_name
 
     def value(self):
         try:
@@ -48,7 +114,7 @@ class DataTensorArg(OpArg):
             raise SchemaError(
                 f'{type(self).__qualname__}: Couldn\'t create value for '
                 f'argument with shape \'{self.shape}\' and dtype '
-                f'\'{self.dtype.name}\'.  Got exception: '
+                f'\'{self.dtype_name}\'.  Got exception: '
                 f'{ex}')
 
     def _value(self):
@@ -90,6 +156,9 @@ class ShapeTensorArg(OpArg):
 
     def value(self):
         return tf.constant(self.shape, dtype=tf.int32)
+
+    def ctor_args(self):
+        return self.shape,
     
     def __repr__(self):
         return f'{self.__class__.__name__}({self.shape})'
@@ -114,6 +183,9 @@ class ShapeListArg(OpArg):
     def value(self):
         return self.shape
 
+    def ctor_args(self):
+        return self.shape,
+
 class ShapeTensor2DArg(OpArg):
     """
     An OpArg produced by ge.ShapeTensor2D
@@ -134,6 +206,9 @@ class ShapeTensor2DArg(OpArg):
         ten = tf.transpose(ten)
         return ten
 
+    def ctor_args(self):
+        return self.content,
+
 class IntArg(OpArg):
     """
     An OpArg produced by ge.ShapeInt
@@ -150,6 +225,9 @@ class IntArg(OpArg):
     def value(self):
         return self.val
 
+    def ctor_args(self):
+        return self.val,
+
 class ValueArg(OpArg):
     """
     An OpArg holding an arbitrary value
@@ -166,3 +244,6 @@ class ValueArg(OpArg):
     def value(self):
         return self.val
 
+    def ctor_args(self):
+        return self.val,
+
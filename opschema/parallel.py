@@ -0,0 +1,76 @@
+import os
+import multiprocessing
+import opschema
+from . import results
+
+"""
+Run OpSchema.validate across several worker processes.  The generated tests
+are divided into shards by test id, each worker registering the op and
+validating one shard.  Each worker generates only its own shard's tests, by
+random access.  The shard outputs are then merged into the same files, in the
+same order, that a single-process run would produce.  Each shard skips the
+duplicate tests within it, and those repeating a test of another shard are
+dropped when merging (see results.consolidate).
+"""
+
+def _validate_shard(op_path, out_dir, shard, validate_args, 
+        validate_kwargs):
+    opschema.register(op_path)
+    op = opschema.get(op_path)
+    return op.validate(out_dir, *validate_args, shard=shard, 
+            **validate_kwargs)
+
+def validate(op_path, out_dir, workers, test_ids, skip_ids, dtype_err_quota,
+        test_edits, rand_seed, show_traceback, resume=False, 
+        corpus_path=None, sample=None, stratified=False, time_budget=None,
+        cover=None, unique=True):
+    """
+    Equivalent to OpSchema.validate, but using {workers} processes.  Returns
+    the category totals of the tests run and the number of duplicates.
+    """
+    if resume:
+        # fold in any shard outputs left by an interrupted run
+        results.consolidate(out_dir, op_path, unique)
+    else:
+        for ext in results.EXTENSIONS:
+            path = results.output_path(out_dir, op_path, ext)
+            if os.path.exists(path):
+                os.remove(path)
+        results.remove_shards(out_dir, op_path)
+
+    validate_args = (test_ids, skip_ids, dtype_err_quota, test_edits, 
+            rand_seed, show_traceback)
+    validate_kwargs = dict(resume=resume, corpus_path=corpus_path, 
+            sample=sample, stratified=stratified, time_budget=time_budget,
+            cover=cover, unique=unique)
+    jobs = [ (op_path, out_dir, (i, workers), validate_args, validate_kwargs) 
+            for i in range(workers) ]
+    # each worker imports TensorFlow itself, so avoid forking this process
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(workers) as pool:
+        shard_stats = pool.starmap(_validate_shard, jobs)
+
+    cats = results.CATEGORIES
+    stats = { c: sum(s[c] for s in shard_stats) for c in cats }
+    stats['duplicates'] = sum(s['duplicates'] for s in shard_stats)
+    if unique:
+        # tests repeating an earlier test of another shard, dropped by
+        # consolidate
+        main_path = results.output_path(out_dir, op_path, 'jsonl')
+        shard_records = [ rec for path in 
+                results.shard_paths(out_dir, op_path, 'jsonl')
+                for rec in results.read_records(path) ]
+        dups = results.duplicate_ids(
+                results.read_records(main_path) + shard_records)
+        for rec in shard_records:
+            if rec['test_id'] in dups:
+                stats[rec['category']] -= 1
+                stats['duplicates'] += 1
+
+    results.consolidate(out_dir, op_path, unique)
+    totals = '  '.join(f'{c}: {stats[c]:-5d}' for c in cats)
+    print(f'Tests: {sum(stats[c] for c in cats):-5d}  {totals}')
+    if stats['duplicates'] > 0:
+        print(f'Skipped {stats["duplicates"]} duplicate tests')
+    return stats
+
@@ -1,9 +1,10 @@
 import sys
 import numpy as np
-import tensorflow as tf
+from .framework import tf
 from collections import defaultdict
 from .error import *
 from . import base, fgraph
+from . import infer as nf
 from .fgraph import NodeFunc, node_name
 
 """
@@ -386,37 +387,141 @@ class Inventory(NodeFunc):
         In the first mode, avail_edits is zero:
             If successful, returns [Fix], which is a zero-cost "fix".
             If failed, returns the empty list
+        In the second mode, avail_edits is positive:
+            Returns the list of fixes of minimal edit distance, or the empty
+            list if none are found within avail_edits.
         Assume that self.op.avail_edits is set appropriately.
         """
         self.op._prep_inference(dtypes, obs_shapes, args)
-        fixes = []
-
         all_nodes = set(self.op.inf_graph.values())
         exc_nodes = (self.op.obs_shapes, self.op.obs_dtypes, self.op.obs_args)
         live_nodes = all_nodes.difference(exc_nodes)
         out_nodes = (self.op.report_inode, )
-        for fix in fgraph.gen_graph_values(live_nodes, out_nodes, self.op):
-            fixes.append(fix[0]) 
-
-        if self.op.avail_edits == 0:
-            # If zero edits are possible, the single fix should be the
-            # unique, zero-edit fix
-            if len(fixes) == 1:
-                return True, fixes
-            elif len(fixes) > 1:
-                fix_str = '\n\n'.join(repr(f) for f in fixes)
-                raise SchemaError(
-                    f'{type(self).__qualname__}: Got multiple matches with '
-                    f'zero edits for framework op \'{self.op.op_path}\'\n'
-                    f'Fixes:\n{fix_str}\n'
-                    f'Observed shapes:\n{obs_shapes}\n'
-                    )
-            else:
-                # no fixes found 
+
+        if self.op.avail_edits != 0:
+            bounds = self.edit_rank_bounds(obs_shapes, args)
+            if bounds is None:
                 return False, []
-        else:
+            self.op.rank_bounds = bounds
+            try:
+                if self.op.fix_search == base.FixSearch.BestFirst:
+                    fixes = self.best_first_fixes(live_nodes, out_nodes)
+                else:
+                    fixes = self.min_cost_fixes(live_nodes, out_nodes)
+            finally:
+                self.op.rank_bounds = None
             return False, fixes
 
+        fixes = self.zero_edit_fixes(live_nodes, out_nodes, obs_shapes, args)
+
+        # If zero edits are possible, the single fix should be the
+        # unique, zero-edit fix
+        if len(fixes) == 1:
+            return True, fixes
+        elif len(fixes) > 1:
+            fix_str = '\n\n'.join(repr(f) for f in fixes)
+            raise SchemaError(
+                f'{type(self).__qualname__}: Got multiple matches with '
+                f'zero edits for framework op \'{self.op.op_path}\'\n'
+                f'Fixes:\n{fix_str}\n'
+                f'Observed shapes:\n{obs_shapes}\n'
+                )
+        else:
+            # no fixes found 
+            return False, []
+
+    def zero_edit_fixes(self, live_nodes, out_nodes, obs_shapes, obs_args):
+        """
+        Find all zero-cost fixes.  Only layouts matching the observed
+        data_format are tried, each with the Layout node pinned and index
+        ranks bounded to those matching the observed shape ranks exactly.  The
+        hypotheses excluded this way all have non-zero cost, so the result is
+        the same as enumerating the whole graph with zero edits.  For a valid
+        call, this is usually a single pass through the graph.
+        """
+        layout_node = self.op._inf_node(nf.Layout)
+        live_nodes = live_nodes.difference((layout_node,))
+        layouts = self.op.data_formats.matching_layouts(obs_args)
+        fixes = []
+        try:
+            for layout in layouts:
+                bounds = nf.rank_bounds(self.op, layout, obs_shapes, obs_args,
+                        0)
+                if bounds is None:
+                    continue
+                self.op.rank_bounds = bounds
+                layout_node.set_cached(layout)
+                gen = fgraph.gen_graph_values(live_nodes, out_nodes, self.op)
+                fixes.extend(fix[0] for fix in gen)
+        finally:
+            self.op.rank_bounds = None
+        return fixes
+
+    def edit_rank_bounds(self, obs_shapes, obs_args):
+        """
+        Bound the index ranks of any fix costing at most op.avail_edits.
+        ArgIndels charges |delta| + 1 for each shape whose rank differs from
+        that implied by its signature, so no shape rank can be off by more
+        than op.avail_edits - 1.  Layouts are enumerated during the search, so
+        the bounds are the union over all layouts.  Returns None if no ranks
+        are within budget.
+        """
+        slack = max(0, self.op.avail_edits - 1)
+        hull = None
+        for layout in range(self.op.data_formats.num_layouts()):
+            bounds = nf.rank_bounds(self.op, layout, obs_shapes, obs_args,
+                    slack)
+            if bounds is None:
+                continue
+            if hull is None:
+                hull = bounds
+            else:
+                hull = { idx: (min(lo, hull[idx][0]), max(hi, hull[idx][1]))
+                        for idx, (lo, hi) in bounds.items() }
+        return hull
+
+    def min_cost_fixes(self, live_nodes, out_nodes):
+        """
+        Branch-and-bound search of the inference graph.  Each time a cheaper
+        fix is found, op.avail_edits is lowered so that the remainder of the
+        search only explores hypotheses at most as costly.  Returns the fixes
+        of minimal cost in enumeration order, which is the same result as
+        searching each edit distance in turn.
+        """
+        avail = bound = self.op.avail_edits
+        best = None
+        fixes = []
+        for fix in fgraph.gen_graph_values(live_nodes, out_nodes, self.op):
+            # edits reserved by the nodes on the path to this fix
+            used = bound - self.op.avail_edits
+            if best is None or used < best:
+                self.op.avail_edits -= bound - used
+                bound = best = used
+                fixes = [fix[0]]
+            else:
+                fixes.append(fix[0])
+        self.op.avail_edits = avail
+        return fixes
+
+    def best_first_fixes(self, live_nodes, out_nodes):
+        """
+        Cost-ordered search of the inference graph.  Returns the first
+        op.max_fixes fixes of minimal cost.  Only as much of the hypothesis
+        space is explored as is needed to find them.
+        """
+        fixes = []
+        best = None
+        gen = fgraph.gen_graph_best_first(live_nodes, out_nodes, self.op)
+        for cost, fix in gen:
+            if best is not None and cost > best:
+                break
+            best = cost
+            fixes.append(fix[0])
+            if len(fixes) == self.op.max_fixes:
+                break
+        gen.close()
+        return fixes
+
 class DataFormat(ReportNodeFunc):
     def __init__(self, formats, gen_node, arg_name):
         super().__init__(arg_name)
@@ -0,0 +1,174 @@
+import json
+import time
+import threading
+
+"""
+Per-node instrumentation of the four computation graphs of an OpSchema.
+
+While a Profiler is installed with fgraph.set_profiler (or OpSchema.profile),
+every evaluation of a PredNode of its schema and every value produced by a
+GenNode of its schema is timed and counted.  Evaluations nest (for example,
+pr.Inventory runs the inference graph, and ge.ArgMutations runs the dims
+graph), so each node records both its total time and its self time, which
+excludes nested node evaluations.
+"""
+
+GRAPHS = ('pred_graph', 'inf_graph', 'gen_graph', 'dims_graph')
+
+class NodeStats(object):
+    def __init__(self):
+        self.calls = 0    # number of times the node function was called
+        self.yields = 0   # number of values produced by a GenNode
+        self.edits = 0    # edit budget reserved by the produced values
+        self.total_ns = 0 # wall time including nested node evaluations
+        self.self_ns = 0  # wall time excluding nested node evaluations
+
+class Profiler(object):
+    """
+    Records call counts, yields, wall time and the edit budget reserved for
+    each node of {op}'s graphs.  If {trace} is set, also records one event
+    per node function call and per produced value, for export as a Chrome
+    trace (see write_trace).
+    """
+    def __init__(self, op, trace=False):
+        self.op = op
+        self.trace = trace
+        self.graph_of = {} # node => graph name
+        for graph in GRAPHS:
+            for node in getattr(op, graph).values():
+                self.graph_of[node] = graph
+        self.reset()
+
+    def reset(self):
+        """
+        Discard all recorded statistics and events
+        """
+        self.stats = {} # (graph, node name) => NodeStats
+        self.events = []
+        self.local = threading.local() # see frames
+        self.origin = time.perf_counter_ns()
+
+    @property
+    def frames(self):
+        """
+        Nested time of each open evaluation of the current thread
+        """
+        frames = getattr(self.local, 'frames', None)
+        if frames is None:
+            frames = self.local.frames = []
+        return frames
+
+    def _budget(self):
+        return self.op.avail_edits + self.op.avail_test_edits
+
+    def _node_stats(self, node):
+        key = (self.graph_of.get(node, type(node).__name__), node.name)
+        st = self.stats.get(key)
+        if st is None:
+            st = self.stats[key] = NodeStats()
+        return st
+
+    def _enter(self):
+        self.frames.append(0)
+        return time.perf_counter_ns()
+
+    def _exit(self, node, phase, start):
+        end = time.perf_counter_ns()
+        frames = self.frames
+        nested_ns = frames.pop()
+        dur = end - start
+        if frames:
+            frames[-1] += dur
+        st = self._node_stats(node)
+        st.total_ns += dur
+        st.self_ns += dur - nested_ns
+        if self.trace:
+            self.events.append({
+                'name': node.name,
+                'cat': self.graph_of.get(node, type(node).__name__),
+                'ph': 'X',
+                'ts': (start - self.origin) / 1000,
+                'dur': dur / 1000,
+                'pid': 1,
+                'tid': threading.get_ident(),
+                'args': { 'phase': phase }
+                })
+        return st
+
+    def call(self, node):
+        """
+        Evaluate PredNode {node}, returning node.value()
+        """
+        start = self._enter()
+        try:
+            return node.value()
+        finally:
+            st = self._exit(node, 'call', start)
+            st.calls += 1
+
+    def values(self, node):
+        """
+        Generate the values of GenNode {node}, timing the function call and
+        the production of each value separately.
+        """
+        budget = self._budget()
+        start = self._enter()
+        try:
+            vals = iter(node.value())
+        finally:
+            st = self._exit(node, 'call', start)
+            st.calls += 1
+
+        try:
+            while True:
+                start = self._enter()
+                try:
+                    val = next(vals, self)
+                finally:
+                    st = self._exit(node, 'next', start)
+                if val is self:
+                    return
+                st.yields += 1
+                st.edits += max(0, budget - self._budget())
+                yield val
+        finally:
+            if hasattr(vals, 'close'):
+                vals.close()
+
+    def table(self):
+        """
+        Aggregated statistics as a printable table, one row per node in
+        order of decreasing self time
+        """
+        header = (f'{"graph":<12} {"node":<40} {"calls":>9} {"yields":>9} '
+                f'{"edits":>7} {"total ms":>10} {"self ms":>10}')
+        lines = [header, '-' * len(header)]
+        items = sorted(self.stats.items(), key=lambda kv: -kv[1].self_ns)
+        for (graph, name), st in items:
+            lines.append(
+                    f'{graph:<12} {name:<40} {st.calls:>9} {st.yields:>9} '
+                    f'{st.edits:>7} {st.total_ns / 1e6:>10.2f} '
+                    f'{st.self_ns / 1e6:>10.2f}')
+        return '\n'.join(lines)
+
+    def graph_totals(self):
+        """
+        Map of graph => self time in seconds summed over its nodes
+        """
+        totals = {}
+        for (graph, _), st in self.stats.items():
+            totals[graph] = totals.get(graph, 0) + st.self_ns / 1e9
+        return totals
+
+    def write_trace(self, path):
+        """
+        Write recorded events in Chrome trace event format, viewable with
+        chrome://tracing or Perfetto
+        """
+        if not self.trace:
+            raise RuntimeError(
+                f'{type(self).__qualname__}: no events were recorded.  '
+                f'Construct with trace=True')
+        with open(path, 'w') as fh:
+            json.dump({ 'traceEvents': self.events,
+                'otherData': { 'op_path': self.op.op_path } }, fh)
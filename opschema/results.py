@@ -0,0 +1,150 @@
+import os
+import re
+import json
+import hashlib
+
+"""
+Reading and writing the outputs of OpSchema.validate.  For each op, these are:
+
+{op_path}.txt       the full report for each test
+{op_path}.sum.txt   a one-line summary for each test
+{op_path}.jsonl     one JSON record for each test, written as it completes
+
+A validation run split into shards writes the same three files with a
+.shard{index} suffix on {op_path}, which are later consolidated into the main
+files.  A test is considered complete once its JSON record is written.
+
+Each JSON record holds a digest of the test's argument signature, by which
+consolidate drops tests which repeat an earlier test of another shard.
+"""
+
+# CRASH and TIMEOUT are tests which killed or outlasted their sandbox worker.
+# See sandbox.py
+CATEGORIES = [ 'TP', 'TN', 'FP', 'FN', 'CRASH', 'TIMEOUT' ]
+EXTENSIONS = [ 'txt', 'sum.txt', 'jsonl' ]
+
+# each test entry in the .txt and .sum.txt files begins with such a line.  In
+# the .txt file it is preceded by the two newlines validate writes before it;
+# any further blank lines end the previous entry
+_ENTRY_START = re.compile(r'(?:\n\n)?^## (\d+)\t', re.MULTILINE)
+
+def output_path(out_dir, stem, ext):
+    return os.path.join(out_dir, f'{stem}.{ext}')
+
+def shard_paths(out_dir, op_path, ext):
+    """
+    Return the paths of all existing shard files for {op_path} with {ext}
+    """
+    pat = re.compile(re.escape(op_path) + r'\.shard\d+\.' + re.escape(ext))
+    names = sorted(n for n in os.listdir(out_dir) if pat.fullmatch(n))
+    return [ os.path.join(out_dir, n) for n in names ]
+
+def split_entries(content):
+    """
+    Split the contents of a .txt or .sum.txt file into a preamble and a list
+    of (test_id, entry) pairs
+    """
+    starts = list(_ENTRY_START.finditer(content))
+    if len(starts) == 0:
+        return content, []
+    preamble = content[:starts[0].start()]
+    ends = [ m.start() for m in starts[1:] ] + [ len(content) ]
+    entries = []
+    for m, end in zip(starts, ends):
+        entries.append((int(m.group(1)), content[m.start():end]))
+    return preamble, entries
+
+def read_records(path):
+    """
+    Read the JSON records in {path}.  A partially written final line, left by
+    an interrupted run, is ignored.
+    """
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, 'r') as fh:
+        for line in fh:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+def write_record(fh, record):
+    print(json.dumps(record), file=fh, flush=True)
+
+def signature_digest(sig):
+    """
+    Short, stable digest of the argument signature {sig} of a test (see
+    OpSchema._args_signature)
+    """
+    return hashlib.sha1(repr(sig).encode('utf-8')).hexdigest()[:16]
+
+def duplicate_ids(records):
+    """
+    Return the test ids of {records} whose signature appears in a record of
+    a smaller test id
+    """
+    first = {}
+    dups = set()
+    for rec in sorted(records, key=lambda rec: rec['test_id']):
+        sig = rec.get('signature')
+        if sig is None:
+            continue
+        if first.setdefault(sig, rec['test_id']) != rec['test_id']:
+            dups.add(rec['test_id'])
+    return dups
+
+def completed_ids(out_dir, op_path):
+    path = output_path(out_dir, op_path, 'jsonl')
+    return { rec['test_id'] for rec in read_records(path) }
+
+def remove_shards(out_dir, op_path):
+    for ext in EXTENSIONS:
+        for path in shard_paths(out_dir, op_path, ext):
+            os.remove(path)
+
+def consolidate(out_dir, op_path, unique=False):
+    """
+    Merge any shard files into the main output files, ordering entries by
+    test id.  Entries of tests without a JSON record are dropped, as are
+    repeated entries.  If {unique}, so are the tests whose signature repeats
+    that of a test with a smaller id (see duplicate_ids), as a single run
+    would have skipped them.  Returns the set of completed test ids.
+    """
+    jsonl_paths = [ output_path(out_dir, op_path, 'jsonl'),
+            *shard_paths(out_dir, op_path, 'jsonl') ]
+    records = {}
+    for path in jsonl_paths:
+        for rec in read_records(path):
+            records.setdefault(rec['test_id'], rec)
+    if unique:
+        for test_id in duplicate_ids(records.values()):
+            del records[test_id]
+    done = set(records.keys())
+
+    for ext in ('txt', 'sum.txt'):
+        main_path = output_path(out_dir, op_path, ext)
+        paths = [ main_path, *shard_paths(out_dir, op_path, ext) ]
+        preamble = ''
+        entries = {}
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r') as fh:
+                pre, file_entries = split_entries(fh.read())
+            preamble = preamble or pre
+            for test_id, entry in file_entries:
+                if test_id in done:
+                    entries.setdefault(test_id, entry)
+        with open(main_path, 'w') as fh:
+            fh.write(preamble)
+            fh.write(''.join(entries[i] for i in sorted(entries)))
+
+    with open(jsonl_paths[0], 'w') as fh:
+        for test_id in sorted(records):
+            write_record(fh, records[test_id])
+
+    remove_shards(out_dir, op_path)
+    return done
+
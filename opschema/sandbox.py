@@ -0,0 +1,272 @@
+import os
+import time
+import signal
+import traceback
+import collections
+import multiprocessing
+from multiprocessing import connection
+import opschema
+from . import oparg
+
+"""
+Crash-isolated execution of the tests run by OpSchema.validate.
+
+A Pool keeps persistent worker processes, each of which imports the framework
+and builds the schema once, then runs the tests sent to it.  A test is sent as
+a compact descriptor: the encoding of its OpArgs (shapes, dtypes and values,
+see OpArg.encode), from which the worker creates the tensors.  The worker
+replies with the outcome computed by OpSchema._run_test.
+
+A worker which dies during a test, for example from a segfault in a kernel,
+gives the test the category CRASH.  One which runs a test for longer than the
+timeout is killed, giving the test the category TIMEOUT.  Either way, the
+worker is replaced and the run continues.  Workers are also replaced after a
+number of tests, or once their resident memory exceeds a threshold, so that
+leaks in the framework do not accumulate.
+"""
+
+def _rss_mb():
+    # current resident set size, or the peak where /proc is unavailable
+    try:
+        with open('/proc/self/statm') as fh:
+            pages = int(fh.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _serve(conn, op_path, settings):
+    """
+    Worker process main loop.  Messages to the parent are ('ready',),
+    ('result', outcome, rss_mb) and ('failed', traceback_text)
+    """
+    # the parent handles Ctrl-C, and stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        op = opschema.init_op(op_path)
+        op._wrapped()
+        for attr, val in settings.items():
+            setattr(op, attr, val)
+    except BaseException:
+        conn.send(('failed', traceback.format_exc()))
+        return
+    conn.send(('ready',))
+
+    while True:
+        try:
+            desc = conn.recv()
+        except EOFError:
+            return
+        if desc is None:
+            return
+        try:
+            op_args = { name: oparg.decode(enc) for name, enc in desc.items() }
+            outcome = op._run_test(op_args)
+        except BaseException:
+            conn.send(('failed', traceback.format_exc()))
+            return
+        conn.send(('result', outcome, _rss_mb()))
+
+def _outcome(category, msg, seconds):
+    # outcome of a test which did not complete in its worker
+    return {
+            'category': category,
+            'seconds': seconds,
+            'framework_msg': msg,
+            'traceback': '',
+            'report': None,
+            'edit_summary': f'\t{msg}',
+            'fix_summary': ''
+            }
+
+def _exit_description(code):
+    if code is not None and code < 0:
+        try:
+            return f'signal {signal.Signals(-code).name}'
+        except ValueError:
+            pass
+    return f'exit code {code}'
+
+class _Worker(object):
+    def __init__(self, ctx, op_path, settings):
+        self.conn, child_conn = ctx.Pipe()
+        self.proc = ctx.Process(target=_serve,
+                args=(child_conn, op_path, settings), daemon=True)
+        self.proc.start()
+        child_conn.close()
+        self.ready = False
+        self.num_tests = 0
+        self.entry = None # pending entry of the test being run
+        self.start_time = None
+
+    def stop(self, kill=False):
+        """
+        Ask the worker to exit, or kill it, without waiting for it
+        """
+        if kill:
+            self.proc.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+        self.conn.close()
+
+class Pool(object):
+    """
+    {size} persistent sandbox workers running tests of the schema {op_path},
+    with the call settings {settings} (attribute => value) applied to each
+    worker's schema.
+
+    A test taking longer than {timeout} seconds is killed.  Workers are
+    replaced after {max_tests} tests, or when their resident memory exceeds
+    {max_rss} MB.  None disables each limit.
+    """
+    def __init__(self, op_path, settings, size=1, timeout=None,
+            max_tests=None, max_rss=None):
+        self.op_path = op_path
+        self.settings = settings
+        self.timeout = timeout
+        self.max_tests = max_tests
+        self.max_rss = max_rss
+        # each worker imports the framework itself, so avoid forking this
+        # process
+        self.ctx = multiprocessing.get_context('spawn')
+        self.workers = [ self._start() for _ in range(size) ]
+        self.retired = [] # processes of replaced workers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for worker in self.workers:
+            worker.stop(kill=worker.entry is not None)
+        for proc in self.retired + [ w.proc for w in self.workers ]:
+            proc.join(5)
+            if proc.is_alive():
+                proc.kill()
+                proc.join()
+        self.workers = []
+        self.retired = []
+
+    def _start(self):
+        return _Worker(self.ctx, self.op_path, self.settings)
+
+    def _replace(self, worker, kill=False):
+        # replacements start while the retired workers exit
+        worker.stop(kill)
+        self.retired = [ p for p in self.retired if p.is_alive() ]
+        self.retired.append(worker.proc)
+        self.workers[self.workers.index(worker)] = self._start()
+
+    def _finish(self, worker, outcome):
+        worker.entry[2] = outcome
+        worker.entry = None
+        worker.num_tests += 1
+
+    def _receive(self, worker):
+        try:
+            msg = worker.conn.recv()
+        except (EOFError, OSError):
+            # the worker died; its sentinel is ready too
+            worker.proc.join()
+            return self._died(worker)
+
+        if msg[0] == 'ready':
+            worker.ready = True
+        elif msg[0] == 'failed':
+            raise RuntimeError(
+                f'Sandbox worker for \'{self.op_path}\' failed:\n{msg[1]}')
+        else:
+            _, outcome, rss = msg
+            self._finish(worker, outcome)
+            if ((self.max_tests is not None and
+                worker.num_tests >= self.max_tests) or
+                (self.max_rss is not None and rss > self.max_rss)):
+                self._replace(worker)
+
+    def _died(self, worker):
+        desc = _exit_description(worker.proc.exitcode)
+        if not worker.ready:
+            raise RuntimeError(
+                f'Sandbox worker for \'{self.op_path}\' exited with {desc} '
+                f'during startup')
+        if worker.entry is not None:
+            seconds = time.perf_counter() - worker.start_time
+            self._finish(worker, _outcome('CRASH',
+                f'Sandbox worker crashed with {desc}', seconds))
+        self._replace(worker)
+
+    def _wait(self):
+        """
+        Wait for any worker to become ready, complete or crash, or for a test
+        to time out
+        """
+        wait_secs = None
+        if self.timeout is not None:
+            now = time.perf_counter()
+            for worker in self.workers:
+                if worker.entry is not None:
+                    left = max(0, worker.start_time + self.timeout - now)
+                    wait_secs = left if wait_secs is None else min(wait_secs,
+                            left)
+
+        objs = [ w.conn for w in self.workers ]
+        objs += [ w.proc.sentinel for w in self.workers ]
+        ready = connection.wait(objs, wait_secs)
+        now = time.perf_counter()
+        for worker in list(self.workers):
+            if worker.conn in ready:
+                self._receive(worker)
+            elif worker.proc.sentinel in ready:
+                worker.proc.join()
+                self._died(worker)
+            elif (self.timeout is not None and worker.entry is not None and
+                    now - worker.start_time >= self.timeout):
+                self._finish(worker, _outcome('TIMEOUT',
+                    f'Test exceeded the timeout of {self.timeout} seconds',
+                    now - worker.start_time))
+                self._replace(worker, kill=True)
+
+    def imap(self, tests):
+        """
+        Run each (test_id, op_args) of {tests}, yielding (test_id, op_args,
+        outcome) in the same order.  See OpSchema._run_test for the outcome.
+        Up to one test per worker is taken from {tests} ahead of the one
+        yielded.
+        """
+        pending = collections.deque() # [test_id, descriptor, outcome]
+        tests = iter(tests)
+        exhausted = False
+        while True:
+            for worker in self.workers:
+                if exhausted or not worker.ready or worker.entry is not None:
+                    continue
+                test = next(tests, None)
+                if test is None:
+                    exhausted = True
+                    break
+                test_id, op_args = test
+                desc = { name: arg.encode() for name, arg in op_args.items() }
+                entry = [test_id, desc, None]
+                pending.append(entry)
+                worker.entry = entry
+                worker.start_time = time.perf_counter()
+                try:
+                    worker.conn.send(desc)
+                except OSError:
+                    pass # the worker died, which _wait finds
+
+            while pending and pending[0][2] is not None:
+                # the generator may have since modified the OpArgs, so they
+                # are rebuilt from their descriptors
+                test_id, desc, outcome = pending.popleft()
+                op_args = { name: oparg.decode(enc) for name, enc in
+                        desc.items() }
+                yield test_id, op_args, outcome
+            if exhausted and not pending:
+                return
+            self._wait()
@@ -1,10 +1,12 @@
-import tensorflow as tf
 import traceback
 import inspect
-from collections import OrderedDict
+from collections import OrderedDict, Counter
 import sys, io, os
 import re
+import time
 import itertools
+import threading
+from contextlib import contextmanager, ExitStack
 from random import Random
 from . import genlib
 from . import predicates as pr
@@ -13,12 +15,19 @@ from . import infer as nf
 from . import report
 from . import base
 from . import fgraph
+from . import results
+from . import corpus
+from . import manifest
+from .framework import tf
+from . import framework
+from .cache import LRUCache
+from .profiler import Profiler
 from .oparg import OpArg
 from .redirect import stderr_redirector
 from .error import *
 from .fgraph import PredNode as P, GenNode as G, FuncNode as F
 from .base import ShapeKind
-from .procfuncs import proc_wrap
+from . import sandbox
 
 
 """
@@ -88,6 +97,25 @@ class Partial(object):
     def __call__(self, *args):
         return self.func(*args, *self.extra_args)
 
+# serializes schema construction, which uses the class-level registries of
+# fgraph nodes
+_init_lock = threading.RLock()
+
+# settings which call contexts take from the schema they serve
+CALL_SETTINGS = ('max_search_dist', 'fix_search', 'max_fixes',
+        'verdict_cache', 'show_graph_calls')
+
+# settings for generating tests, with their defaults.  See _gen_index
+GEN_SETTINGS = {
+        'avail_test_edits': 0,
+        'max_yield_count': 1000,
+        # error quotas
+        'dtype_err_quota': 2,
+        # if set, generate a {cover_strength}-wise covering array of the
+        # component dims in GenDims rather than all combinations
+        'cover_strength': None
+        }
+
 class OpSchema(object):
     def __init__(self, op_path):
         self.op_path = op_path
@@ -95,22 +123,33 @@ class OpSchema(object):
 
         # flags
         self.avail_edits = 0
-        self.avail_test_edits = 0
-        self.max_yield_count = 1000
         self.comp_dims_mode = None 
-
-        # error quotas
-        self.dtype_err_quota = 2
+        self.reset_gen_settings()
 
         # TODO: enable setting this
         self.max_search_dist = 4
         self.show_graph_calls = False 
 
+        # strategy used by pr.Inventory to find fixes.  With
+        # FixSearch.BestFirst, the search stops after max_fixes fixes of
+        # minimal cost (or all of them if None)
+        self.fix_search = base.FixSearch.DepthFirst
+        self.max_fixes = None
+
+        # LRU cache of _check_args outcomes, enabled by enable_verdict_cache 
+        self.verdict_cache = None
+
+        # if set, pri_idx => (lo, hi), restricting the ranks produced by
+        # nf.RankRange.  See nf.rank_bounds
+        self.rank_bounds = None
+
         # used by IndexDims and ArgShapes to compute index dimensions 
         self.target_nelem = 1e6
 
         # params is used to retrieve values during testing
         self.arg_order = None
+        self._framework_op = None # see framework_op
+        self._func_sig = None
         self.arg_gen_nodes = {} # arg_name => GenNode
         self.args_gnode = None
 
@@ -123,6 +162,15 @@ class OpSchema(object):
         # Random Number Generators
         self.gen_rng = Random()
 
+        # number of tests skipped as duplicates by the last generate_args
+        # or validate call
+        self.num_duplicates = 0
+
+        # fgraph.GenGraphIndex over gen_graph, and the settings it was built
+        # for
+        self.gen_index = None
+        self.gen_index_key = None
+
         # provides information for gr.DimsInput nodes
         self.dims_graph_input = {}
 
@@ -160,6 +208,26 @@ class OpSchema(object):
         self.arguments = {}
         self.returns = [] 
 
+        # idle call contexts of the wrapped op.  See _acquire_context
+        self.free_contexts = [self]
+        self.context_lock = threading.Lock()
+
+    def __getstate__(self):
+        # drop the framework objects, locks and caches, which are restored
+        # to their initial state by __setstate__.  See diskcache
+        state = self.__dict__.copy()
+        for attr in ('framework_mod', 'wrapped_op', 'free_contexts',
+                'context_lock'):
+            state.pop(attr, None)
+        state.update(_framework_op=None, _func_sig=None, verdict_cache=None,
+                gen_index=None, gen_index_key=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.free_contexts = [self]
+        self.context_lock = threading.Lock()
+
     def _pred_node(self, pred_class, name=None):
         name = fgraph.node_name(pred_class, name)
         return self.pred_graph.get(name, None)
@@ -179,11 +247,25 @@ class OpSchema(object):
         name = fgraph.node_name(dims_class, name)
         return self.dims_graph.get(name, None)
 
-    def _init(self, init_schema_func):
+    def _init(self, init_schema_func, framework_op=None):
+        # graph construction uses the class-level node registries
+        with _init_lock:
+            self._init_graphs(init_schema_func, framework_op)
+
+    def _init_graphs(self, init_schema_func, framework_op):
+        self.init_schema_func = init_schema_func
+        self._framework_op = framework_op
+        self._func_sig = None
+        params = None
+        prefix = self.op_path.split('.', 1)[0]
+        if framework_op is None and not framework.is_loaded(prefix):
+            # the manifest may be from another framework version, so it is
+            # only used to avoid the import.  See func_sig
+            params = manifest.SIGNATURES.get(self.op_path)
+        if params is None:
+            params = self.func_sig.parameters.keys()
+        self.arg_order = list(params)
         # edges to create for the pred graph
-        self.framework_op = eval(self.op_path)
-        self.func_sig = inspect.signature(self.framework_op)
-        self.arg_order = list(self.func_sig.parameters.keys())
         self.pending_pred_edges = {} # node name -> [parent node name, ...]
         self.pending_index_edges = {} # node name -> [idx, idx, ...]
         self._init_pred_graph()
@@ -193,41 +275,213 @@ class OpSchema(object):
         init_schema_func(self)
         self._finalize()
 
+    @property
+    def framework_op(self):
+        """
+        The framework op, resolved from op_path on first use
+        """
+        if self._framework_op is None:
+            self._framework_op = framework.resolve(self.op_path)
+        return self._framework_op
+
+    @property
+    def func_sig(self):
+        """
+        Signature of the framework op.  If its parameters differ from those
+        listed in opschema.manifest, for example under another framework
+        version, arg_order is taken from the signature instead.
+        """
+        if self._func_sig is None:
+            sig = inspect.signature(self.framework_op)
+            params = list(sig.parameters.keys())
+            if self.arg_order is not None and params != self.arg_order:
+                print(f'Parameters of {self.op_path} are {params} but '
+                        f'opschema.manifest lists {self.arg_order}.  Using '
+                        f'the former.  Regenerate the manifest with '
+                        f'python -m opschema.manifest', file=sys.stderr)
+                self.arg_order = params
+            self._func_sig = sig
+        return self._func_sig
+
     def _wrapped(self):
         """
         Create and return a wrapped op
         """
         fw_mod = self.op_path.split('.', 1)[0]
-        self.framework_mod = eval(fw_mod) 
+        self.framework_mod = framework.get_module(fw_mod)
+        # resolve the framework op now, before the wrapped op is installed
+        # in its place, checking arg_order against its signature
+        self.func_sig
 
         def wrapped_op(*args, **kwargs):
             # executes during 'framework call phase'
+            ctx = self._acquire_context()
             try:
-                self.op_error = self._check_args(*args, **kwargs)
-            except BaseException as ex:
-                raise OpSchemaInternalError(ex)
-            try:
-                # exit_code, ret_val = proc_wrap(self.framework_op, **self.arguments)
-                ret_val = self.framework_op(**self.arguments)
-                self._check_return(ret_val)
-                return ret_val
-            except BaseException as ex:
-                exc_str = str(ex)
-                mt = re.match('\{\{.+?\}\} (.+)', exc_str)
-                if mt is None:
-                    self.framework_exc_msg = exc_str 
-                else:
-                    self.framework_exc_msg = mt.groups()[0]
-                self.framework_tblines = traceback.format_tb(ex.__traceback__)
-                raise ex
+                return ctx._call_wrapped(args, kwargs)
             finally:
-                msg = self._report()
-                if msg is not None:
-                    print(msg, file=sys.stderr)
+                self._release_context(ctx)
 
         self.wrapped_op = wrapped_op
         return wrapped_op
 
+    def _call_wrapped(self, args, kwargs):
+        """
+        Check the arguments, call the framework op and report any error
+        """
+        try:
+            self.op_error = self._cached_check_args(*args, **kwargs)
+        except BaseException as ex:
+            raise OpSchemaInternalError(ex)
+        try:
+            ret_val = self.framework_op(**self.arguments)
+            self._check_return(ret_val)
+            return ret_val
+        except BaseException as ex:
+            exc_str = str(ex)
+            mt = re.match('\{\{.+?\}\} (.+)', exc_str)
+            if mt is None:
+                self.framework_exc_msg = exc_str 
+            else:
+                self.framework_exc_msg = mt.groups()[0]
+            self.framework_tblines = traceback.format_tb(ex.__traceback__)
+            raise ex
+        finally:
+            msg = self._report()
+            if msg is not None:
+                print(msg, file=sys.stderr)
+
+    def _acquire_context(self):
+        """
+        Return an idle call context for the wrapped op.  A call context is an
+        OpSchema holding the node values, edit budgets and observations of
+        one call.  Whenever it is idle, this schema itself is used, so that a
+        caller using the op from one thread can inspect op_error and the
+        other call state as before, even after earlier concurrent calls.
+        Concurrent or reentrant calls each get another context, built from
+        the same schema definition.
+        """
+        with self.context_lock:
+            if self.free_contexts:
+                ctx = self.free_contexts.pop()
+            else:
+                ctx = None
+        if ctx is None:
+            ctx = OpSchema(self.op_path)
+            ctx._init(self.init_schema_func, self.framework_op)
+            ctx.framework_mod = self.framework_mod
+        if ctx is not self:
+            for attr in CALL_SETTINGS:
+                setattr(ctx, attr, getattr(self, attr))
+        return ctx
+
+    def _release_context(self, ctx):
+        # free_contexts is used as a stack with this schema kept on top
+        with self.context_lock:
+            if ctx is self:
+                self.free_contexts.append(ctx)
+            else:
+                self.free_contexts.insert(0, ctx)
+
+    def enable_verdict_cache(self, maxsize=256):
+        """
+        Cache the outcome of argument checking in the wrapped op for up to
+        {maxsize} distinct call signatures.  A call signature consists of the
+        shapes and dtypes of data tensors together with the values of all
+        other arguments.
+        """
+        self.verdict_cache = LRUCache(maxsize)
+
+    def disable_verdict_cache(self):
+        self.verdict_cache = None
+
+    def verdict_cache_stats(self):
+        """
+        Return a map of size, maxsize, hits, misses and evictions, or None if
+        the cache is not enabled
+        """
+        if self.verdict_cache is None:
+            return None
+        return self.verdict_cache.stats()
+
+    @contextmanager
+    def profile(self, trace=False):
+        """
+        Record per-node call counts, yields, edits and wall time of the
+        evaluations of this schema's graphs within the with block, yielding
+        the profiler.Profiler.  Calls of the wrapped op served by other call
+        contexts (see _acquire_context) are not recorded.  If {trace}, also
+        record events for Profiler.write_trace
+        """
+        prof = Profiler(self, trace)
+        prev = fgraph.set_profiler(prof.graph_of, prof)
+        try:
+            yield prof
+        finally:
+            fgraph.set_profiler(prof.graph_of, prev)
+
+    def _call_key(self, val):
+        """
+        Hashable representation of argument value {val}.  Type names are
+        included so that, for example, 1, 1.0 and True are distinguished.
+        """
+        if isinstance(val, tf.Tensor):
+            return ('tensor', val.dtype.name, tuple(val.shape.as_list()))
+        elif isinstance(val, (list, tuple)):
+            return (type(val).__name__, tuple(self._call_key(v) for v in val))
+        hash(val) # raises TypeError for unhashable values
+        return (type(val).__name__, val)
+
+    def _call_signature(self, arguments):
+        """
+        Canonical, hashable signature of the bound {arguments}, or None if
+        one of them has no hashable representation, for example a symbolic
+        tensor.  The contents of tensors which are not data tensors are
+        included since they may be interpreted as shapes.
+        """
+        items = []
+        try:
+            for arg_name, val in arguments.items():
+                key = self._call_key(val)
+                if (isinstance(val, tf.Tensor) and 
+                        arg_name not in self.data_tensors):
+                    contents = tuple(val.numpy().flatten().tolist())
+                    key = (*key, contents)
+                items.append((arg_name, key))
+        except Exception:
+            # symbolic tensors have no contents, and may have unknown shapes
+            return None
+        flags = (self.max_search_dist, self.fix_search, self.max_fixes)
+        return (flags, tuple(items))
+
+    def _cached_check_args(self, *args, **kwargs):
+        """
+        Same as _check_args, but consults the verdict cache if enabled
+        """
+        if self.verdict_cache is None:
+            return self._check_args(*args, **kwargs)
+
+        bind = self.func_sig.bind(*args, **kwargs)
+        bind.apply_defaults()
+        key = self._call_signature(bind.arguments)
+        if key is None:
+            return self._check_args(*args, **kwargs)
+
+        entry = self.verdict_cache.get(key)
+        if entry is None:
+            op_error = self._check_args(*args, **kwargs)
+            obs = (self.obs_dtypes.get_cached(), self.obs_shapes.get_cached(),
+                    self.obs_args.get_cached())
+            self.verdict_cache.put(key, (op_error, self.inf_result, obs))
+            return op_error
+
+        self.arguments = bind.arguments
+        self.returns.clear()
+        self.framework_exc_msg = None
+        self.framework_tblines = []
+        op_error, self.inf_result, obs = entry
+        self._prep_inference(*obs)
+        return op_error
+
     def _check_args(self, *args, **kwargs):
         """
         The main function to check all input arguments for all constraints
@@ -237,10 +491,9 @@ class OpSchema(object):
         pr.ErrorReport    local error
         base.Fix list     more complex errors
 
-        How many fixes do we want?
-        
+        The returned Fix list holds all fixes of the smallest edit distance
+        within max_search_dist.
         """
-        fixes = []
         bind = self.func_sig.bind(*args, **kwargs)
         bind.apply_defaults()
         self.arguments = bind.arguments
@@ -249,32 +502,37 @@ class OpSchema(object):
         self.framework_tblines = []
         self.inf_result = None
 
-        for dist in range(self.max_search_dist+1):
-            self.avail_edits = dist
-            # returns the value of the first failing predicate node, or
-            # none if all succeed
-            ret = fgraph.pred_graph_evaluate(*self.predicate_nodes)
-            if isinstance(ret, pr.ErrorReport):
-                # error occurred in one of the single-argument handling nodes
-                return ret
-            elif ret == []:
-                # no fixes found at this edit distance
-                continue
-            elif ret is None:
-                # success
-                # by definition, there was one fix from pr.Inventory, and
-                # it has zero edit distance
-                fix = self.inventory_node.get_cached()[0]
-                self.inf_result = fix.shape 
-                return None
-            else:
-                # ret is a list of Fix objects
-                if not isinstance(ret, list):
-                    raise RuntimeError(f'Got pred graph type {type(ret)}')
-                return ret
-                # fixes.extend(ret)
-        # No fixes found
-        return pr.ErrorReport(pr.NoSuggestionsFound())
+        # The first pass looks for the unique zero-edit fix.  If there is
+        # none, only pr.Inventory is re-run, with the full edit budget.  The
+        # argument-parsing nodes keep their results from the first pass since
+        # both passes share an epoch.
+        epoch = fgraph.new_epoch()
+        self.avail_edits = 0
+        ret = fgraph.pred_graph_evaluate(*self.predicate_nodes, epoch=epoch)
+        if ret == [] and self.max_search_dist > 0:
+            self.avail_edits = self.max_search_dist
+            self.inventory_node.invalidate()
+            ret = fgraph.pred_graph_evaluate(*self.predicate_nodes,
+                    epoch=epoch)
+
+        if isinstance(ret, pr.ErrorReport):
+            # error occurred in one of the single-argument handling nodes
+            return ret
+        elif ret == []:
+            # No fixes found
+            return pr.ErrorReport(pr.NoSuggestionsFound())
+        elif ret is None:
+            # success
+            # by definition, there was one fix from pr.Inventory, and
+            # it has zero edit distance
+            fix = self.inventory_node.get_cached()[0]
+            self.inf_result = fix.shape 
+            return None
+        else:
+            # ret is a list of Fix objects
+            if not isinstance(ret, list):
+                raise RuntimeError(f'Got pred graph type {type(ret)}')
+            return ret
 
     def _check_return(self, op_return):
         """
@@ -664,11 +922,11 @@ class OpSchema(object):
                 f'Unknown type of input error: {type(self.op_error)}')
         return msg
 
-    def _report_edit_summary(self):
+    def _fix_summary(self):
         """
-        In case of TP and FP, provides a single-line summary of the list of
-        suggested edits.  For TN, the empty string.  For FN, the framework
-        exception in string form.
+        A single-line summary of the list of suggested edits, the error
+        message for errors in individual arguments, or the empty string if
+        there was no error
         """
         if self.op_error is None:
             msg = '' 
@@ -683,7 +941,15 @@ class OpSchema(object):
         else:
             raise RuntimeError(
                 f'Unknown type of input error: {type(self.op_error)}')
+        return msg
 
+    def _report_edit_summary(self):
+        """
+        In case of TP and FP, provides a single-line summary of the list of
+        suggested edits.  For TN, the empty string.  For FN, the framework
+        exception in string form.
+        """
+        msg = self._fix_summary()
         msg += '\t' + (self.framework_exc_msg or '')
 
         # summarize returns if any
@@ -815,24 +1081,379 @@ class OpSchema(object):
 
         pred = set(self.pred_graph.values()).difference(self.return_nodes)
         self.predicate_nodes = pred
+        self._push_down_rank_filters()
+
+    def _push_down_rank_filters(self):
+        """
+        Gen nodes ge.ShapeInt and ge.ShapeTensor2D yield nothing unless the
+        argument ranks satisfy a condition.  Check these conditions already in
+        ge.ArgIndels, so that dead branches are pruned before ge.ArgMutations
+        computes the dims.
+        """
+        indels_node = self._gen_node(ge.ArgIndels)
+        for node in self.gen_graph.values():
+            if isinstance(node.func, (ge.ShapeInt, ge.ShapeTensor2D)):
+                indels_node.func.add_rank_filter(node.func.ranks_ok)
 
     def _prep_inference(self, obs_dtypes, obs_shapes, obs_args):
         self.obs_dtypes.set_cached(obs_dtypes)
         self.obs_shapes.set_cached(obs_shapes)
         self.obs_args.set_cached(obs_args)
 
+    def reset_gen_settings(self):
+        """
+        Restore the settings for generating tests to their defaults
+        """
+        for attr, val in GEN_SETTINGS.items():
+            setattr(self, attr, val)
+
     def _prep_gen_inventory(self):
         self.avail_test_edits = 0
 
-    def generate_args(self, rand_seed=12345):
-        live = self.gen_graph.values()
-        out = [self._gen_node(ge.Args)]
-        self.gen_rng.seed(rand_seed)
-        for op_args in fgraph.gen_graph_values(live, out, self):
-            yield op_args[0] # extract tuple element
+    def _gen_index(self, rand_seed):
+        """
+        Return the fgraph.GenGraphIndex enumerating generated tests for
+        {rand_seed} under the current generation settings.  Counts memoized
+        by the index are reused as long as these settings are unchanged.
+        """
+        key = (rand_seed, self.avail_test_edits, self.dtype_err_quota, 
+                self.max_yield_count, self.cover_strength)
+        if self.gen_index_key != key:
+            live = self.gen_graph.values()
+            out = [self._gen_node(ge.Args)]
+            self.gen_index = fgraph.GenGraphIndex(live, out, self, rand_seed,
+                    self._gen_state, self._set_gen_state)
+            self.gen_index_key = key
+        return self.gen_index
+
+    def _gen_state(self):
+        """
+        The op state, besides node inputs, which gen nodes consult
+        """
+        return self.avail_test_edits, self.max_yield_count
+
+    def _set_gen_state(self, state):
+        self.avail_test_edits, self.max_yield_count = state
+
+    def generate_args(self, rand_seed=12345, unique=False):
+        """
+        Generate the op_args of each test.  If {unique}, skip tests whose
+        arguments have the same signature as an earlier one, counting them in
+        num_duplicates.
+        """
+        self.num_duplicates = 0
+        seen = set()
+        for op_args in self._gen_index(rand_seed):
+            op_args = op_args[0] # extract tuple element
+            if unique:
+                sig = self._args_signature(op_args)
+                if sig in seen:
+                    self.num_duplicates += 1
+                    continue
+                seen.add(sig)
+            yield op_args
+
+    @staticmethod
+    def _args_signature(op_args):
+        """
+        Hashable signature of the generated arguments of a test
+        """
+        return tuple((k, v.signature()) for k, v in sorted(op_args.items()))
+
+    def num_tests(self, rand_seed=12345):
+        """
+        The number of tests produced by generate_args(rand_seed)
+        """
+        return self._gen_index(rand_seed).count()
+
+    def count_tests(self, rand_seed=12345):
+        """
+        Count the tests produced by generate_args(rand_seed), broken down by
+        layout, index rank combination and kinds of edits.  Returns a Counter
+        keyed by (layout, index_ranks, edit_kinds), where index_ranks is a
+        tuple of (index, rank) pairs and edit_kinds a sorted tuple of the
+        GenFunc.edit_kind of each edit in the test (empty if none).
+        """
+        counts = Counter()
+        tally = self._gen_index(rand_seed).tally(self._test_labels)
+        for labels, num in tally.items():
+            counts[self._test_stratum(labels)] += num
+        return counts
+
+    def _test_labels(self, node, val, state):
+        """
+        Labels for GenGraphIndex.tally used to classify generated tests
+        """
+        labels = []
+        if isinstance(node.func, ge.Layout):
+            labels.append(('layout', val))
+        elif isinstance(node.func, ge.IndexRanks):
+            labels.append(('ranks', tuple(sorted(val.items()))))
+        avail_edits, _ = state
+        if self.avail_test_edits < avail_edits:
+            labels.append(('edit', node.func.edit_kind))
+        return tuple(labels)
+
+    def _test_stratum(self, labels):
+        """
+        Convert the labels of a test to its (layout, index_ranks, edit_kinds)
+        """
+        layout = next((v for k, v in labels if k == 'layout'), 0)
+        ranks = next((v for k, v in labels if k == 'ranks'), ())
+        edits = tuple(sorted(v for k, v in labels if k == 'edit'))
+        return layout, ranks, edits
+
+    def _sample_draws(self, num_samples, rand_seed, stratified):
+        """
+        Choose the sample for sample_args.  Returns a list of functions, each
+        returning one (test_id, op_args) pair of the sample
+        """
+        index = self._gen_index(rand_seed)
+        rng = Random(rand_seed)
+        def draw(i):
+            return lambda: (i + 1, index.get(i)[0])
+        def draw_matching(i, stratum):
+            accept = lambda labels: self._test_stratum(labels) == stratum
+            def func():
+                pos, op_args = index.get_matching(i, self._test_labels, accept)
+                return pos + 1, op_args[0]
+            return func
+
+        if not stratified:
+            total = index.count()
+            if num_samples is None or num_samples > total:
+                num_samples = total
+            return [ draw(i) for i in rng.sample(range(total), num_samples) ]
+
+        counts = self.count_tests(rand_seed)
+        strata = sorted(counts.keys())
+        if num_samples is None or num_samples > sum(counts.values()):
+            num_samples = sum(counts.values())
+
+        # share the sample as evenly as possible, smallest strata first
+        quota = {}
+        remain = num_samples
+        by_size = sorted(strata, key=lambda st: counts[st])
+        for k, stratum in enumerate(by_size):
+            share = remain // (len(strata) - k)
+            quota[stratum] = min(counts[stratum], share)
+            remain -= quota[stratum]
+
+        picks = { st: rng.sample(range(counts[st]), quota[st]) for st in strata }
+        draws = []
+        for r in range(max(quota.values(), default=0)):
+            for stratum in strata:
+                if r < quota[stratum]:
+                    draws.append(draw_matching(picks[stratum][r], stratum))
+        return draws
+
+    def sample_args(self, num_samples=None, rand_seed=12345, 
+            stratified=False):
+        """
+        Generate (test_id, op_args) for a random sample of {num_samples}
+        distinct tests (or all of them if None) out of those produced by
+        generate_args(rand_seed), where test_id is the position of the test
+        in generate_args, counting from 1.  The sample depends only on
+        {rand_seed} and the generation settings, and only the sampled tests
+        are generated.
+
+        If {stratified}, the sample is divided as evenly as possible among the
+        (layout, index_ranks, edit_kinds) strata of count_tests, and is yielded
+        round-robin across strata, so that every prefix of it is balanced.
+        Otherwise it is drawn uniformly, in random order.
+        """
+        for draw in self._sample_draws(num_samples, rand_seed, stratified):
+            yield draw()
+
+    def get_args(self, test_id, rand_seed=12345):
+        """
+        Return the test {test_id} (counting from 1) produced by
+        generate_args(rand_seed), without generating the tests before it
+        """
+        try:
+            op_args = self._gen_index(rand_seed).get(test_id - 1)
+        except IndexError:
+            raise SchemaError(
+                f'{type(self).__qualname__}: test id {test_id} out of range.  '
+                f'There are {self.num_tests(rand_seed)} tests for '
+                f'\'{self.op_path}\'')
+        return op_args[0]
+
+    def _selected_cases(self, test_ids, shard, rand_seed):
+        """
+        Iterate over (test_id, op_args) in order, for {test_ids} (or all tests
+        if None) which belong to {shard}, using random access.  The tests are
+        not counted beforehand: iteration stops at the first id out of range
+        """
+        if test_ids is None:
+            ids = itertools.count(1)
+        else:
+            ids = sorted(i for i in test_ids if i >= 1)
+        if shard is not None:
+            shard_index, num_shards = shard
+            ids = ( i for i in ids if (i - 1) % num_shards == shard_index )
+        index = self._gen_index(rand_seed)
+        for test_id in ids:
+            try:
+                op_args = index.get(test_id - 1)
+            except IndexError:
+                return
+            yield test_id, op_args[0]
+
+    def _corpus_cases(self, corpus_path, test_ids, rand_seed):
+        """
+        Return an iterator over (test_id, op_args) of the corpus at
+        {corpus_path}.  If {test_ids} is given, only those cases are loaded.
+        Raises SchemaError unless the corpus was generated for this op with
+        {rand_seed} and the current generation settings.
+        """
+        cor = corpus.Corpus(corpus_path)
+        try:
+            if cor.op_path != self.op_path:
+                raise SchemaError(
+                    f'Corpus \'{corpus_path}\' holds test cases for '
+                    f'\'{cor.op_path}\', not \'{self.op_path}\'')
+            cor.check_settings(rand_seed, self.avail_test_edits,
+                    self.dtype_err_quota)
+        except BaseException:
+            cor.close()
+            raise
+        return self._iter_corpus(cor, test_ids)
+
+    def _iter_corpus(self, cor, test_ids):
+        with cor:
+            if test_ids is None:
+                yield from cor
+            else:
+                for test_id in sorted(i for i in test_ids if i <= len(cor)):
+                    yield test_id, cor.get(test_id)
+
+    def _run_test(self, op_args):
+        """
+        Call the wrapped op with the arguments {op_args}, returning a map of
+        the outcome: its category, the call time in seconds, the framework
+        exception message and traceback, and the opschema report, edit
+        summary and fix summary
+        """
+        arg_dict = { k: v.value() for k, v in op_args.items() }
+        string_err = io.BytesIO()
+        start_time = time.perf_counter()
+        try:
+            with stderr_redirector(string_err):
+                self.wrapped_op(**arg_dict)
+        except (OpSchemaInternalError, SchemaError) as ex:
+            print(string_err.getvalue().decode('UTF-8'))
+            raise ex
+        except BaseException as ex:
+            pass
+        seconds = time.perf_counter() - start_time
+
+        if self.op_error is None:
+            cat = 'TN' if self.framework_exc_msg is None else 'FN'
+        else:
+            cat = 'FP' if self.framework_exc_msg is None else 'TP'
+
+        return {
+                'category': cat,
+                'seconds': seconds,
+                'framework_msg': self.framework_exc_msg,
+                'traceback': ''.join(self.framework_tblines),
+                'report': self._report(),
+                'edit_summary': self._report_edit_summary(),
+                'fix_summary': self._fix_summary()
+                }
+
+    def _write_test(self, test_id, op_args, outcome, stats, shard,
+            show_traceback, report_fh, summary_fh, records_fh):
+        """
+        Record the {outcome} of test {test_id} (see _run_test) in the
+        validate outputs, and count it in {stats}
+        """
+        cat = outcome['category']
+        stats[cat] += 1
+        if shard is None:
+            progress = '  '.join(f'{c}: {stats[c]:-5d}' 
+                    for c in results.CATEGORIES)
+            print(f'\rTest: {test_id:-5d}  {progress}', end='')
+        arg_fields = ', '.join(f'{k}={op_args[k]}' for k in self.arg_order
+                if k in op_args)
+        call = f'## {test_id}\t{cat}\t{self.op_path}: {arg_fields}'
+        print(f'\n\n{call}', file=report_fh)
+        
+        print('TensorFlow Exception', file=report_fh)
+        if show_traceback:
+            print(outcome['traceback'], file=report_fh)
+        print(f'{outcome["framework_msg"]}\n', file=report_fh)
+
+        print(outcome['report'], file=report_fh)
+        summary = f'{call}\t{outcome["edit_summary"]}'
+        print(summary, file=summary_fh)
+        report_fh.flush()
+        summary_fh.flush()
+
+        # written last, marking the test complete
+        record = {
+                'test_id': test_id,
+                'category': cat,
+                'args': arg_fields,
+                'fix_summary': outcome['fix_summary'],
+                'framework_msg': outcome['framework_msg'],
+                'seconds': round(outcome['seconds'], 6),
+                'signature': results.signature_digest(
+                    self._args_signature(op_args))
+                }
+        results.write_record(records_fh, record)
 
     def validate(self, out_dir, test_ids, skip_ids, dtype_err_quota,
-            test_edits, rand_seed, show_traceback=True):
+            test_edits, rand_seed, show_traceback=True, shard=None, 
+            resume=False, corpus_path=None, sample=None, stratified=False,
+            time_budget=None, cover=None, unique=True, sandbox_workers=None,
+            test_timeout=None, max_worker_tests=None, max_worker_rss=None):
+        """
+        Run generated tests, writing a report to {op_path}.txt, a one-line
+        summary per test to {op_path}.sum.txt and a JSON record per test to
+        {op_path}.jsonl in {out_dir}.  See results.py for details.
+
+        If {shard} is an (index, count) pair, run only those tests with
+        (test_id - 1) % count == index, writing instead to
+        {op_path}.shard{index}.*
+
+        If {resume}, skip tests already recorded in {op_path}.jsonl, appending
+        the rest to the existing outputs.  Tensors of skipped tests are not
+        created.
+
+        If {corpus_path} is given, the test cases are read from that corpus
+        (see corpus.py) rather than generated.
+
+        If {sample} or {stratified} is given, run only the random sample of
+        {sample} tests (or all tests in random order) produced by
+        sample_args.  A {shard} then takes every count'th test of the
+        sample.
+
+        If {cover} is given, set cover_strength to it, so that the dims of
+        each index are a {cover}-wise covering array of its components rather
+        than all their combinations (see ge.GenDims).  Test ids are then
+        positions among those tests.
+
+        If {time_budget} is given, stop starting new tests after that many
+        seconds.
+
+        If {unique}, tests with the same argument signature as an earlier test
+        in the run are skipped and counted in num_duplicates.  (With a
+        {shard}, only the tests within the shard are compared.  Duplicates
+        across shards are dropped when the shards are consolidated, see
+        results.consolidate)
+
+        If {sandbox_workers} is given, the tests are run by that many
+        persistent worker processes (see sandbox.py), and a test which
+        crashes its worker or runs longer than {test_timeout} seconds is
+        recorded as CRASH or TIMEOUT.  If given, a worker is replaced after
+        {max_worker_tests} tests or once its resident memory exceeds
+        {max_worker_rss} MB.  Giving {test_timeout} alone runs one worker.
+
+        Returns a map of category => count of tests run, plus the number of
+        'duplicates' skipped
+        """
         if not os.path.exists(out_dir):
             raise RuntimeError(
                 f'{type(self).__qualname__}: Could not open output path '
@@ -840,74 +1461,115 @@ class OpSchema(object):
 
         self.dtype_err_quota = dtype_err_quota
         self.avail_test_edits = test_edits
-
-        report_fh = open(os.path.join(out_dir, f'{self.op_path}.txt'), 'w')
-        summary_fh = open(os.path.join(out_dir, f'{self.op_path}.sum.txt'), 'w')
-        cats = [ 'TP', 'TN', 'FP', 'FN' ]
+        self.cover_strength = cover
+        if test_timeout is not None and sandbox_workers is None:
+            sandbox_workers = 1
+
+        if shard is None:
+            stem = self.op_path
+            if resume:
+                done_ids = results.consolidate(out_dir, self.op_path, unique)
+            else:
+                results.remove_shards(out_dir, self.op_path)
+        else:
+            shard_index, num_shards = shard
+            stem = f'{self.op_path}.shard{shard_index}'
+            if resume:
+                done_ids = results.completed_ids(out_dir, self.op_path)
+
+        if not resume:
+            done_ids = set()
+        mode = 'a' if (resume and shard is None) else 'w'
+        cats = results.CATEGORIES
         stats = { k: 0 for k in cats }
 
-        op_args_gen = self.generate_args(rand_seed)
+        sampling = (sample is not None or stratified)
+        if corpus_path is None and sampling:
+            draws = self._sample_draws(sample, rand_seed, stratified)
+            if shard is not None:
+                draws = draws[shard_index::num_shards]
+            cases = (draw() for draw in draws)
+        elif corpus_path is None and (test_ids is not None or 
+                shard is not None):
+            cases = self._selected_cases(test_ids, shard, rand_seed)
+        elif corpus_path is None:
+            cases = enumerate(self.generate_args(rand_seed), 1)
+        else:
+            cases = self._corpus_cases(corpus_path, test_ids, rand_seed)
+
+        if time_budget is not None:
+            deadline = time.perf_counter() + time_budget
 
-        for test_id, op_args in enumerate(op_args_gen, 1):
-            if skip_ids is not None and test_id in skip_ids:
-                continue
+        self.num_duplicates = 0
+        seen = set()
 
-            if test_ids is not None:
-                if len(test_ids) == 0:
+        def selected():
+            for test_id, op_args in cases:
+                if (time_budget is not None and
+                        time.perf_counter() > deadline):
                     break
-                if test_id not in test_ids:
-                    continue
-                else:
-                    test_ids.remove(test_id)
 
-            # self.show_graph_calls = True
-            arg_dict = { k: v.value() for k, v in op_args.items() }
-            # print(test_id, op_args)
-            # continue
-            string_err = io.BytesIO()
-            try:
-                # proc_wrap(self, op_args)
-                with stderr_redirector(string_err):
-                    self.wrapped_op(**arg_dict)
-                    # pass
-            except (OpSchemaInternalError, SchemaError) as ex:
-                print(string_err.getvalue().decode('UTF-8'))
-                raise ex
-            except BaseException as ex:
-                pass
-                # raise ex
+                if skip_ids is not None and test_id in skip_ids:
+                    continue
 
-            if self.op_error is None:
-                cat = 'TN' if self.framework_exc_msg is None else 'FN'
+                if test_ids is not None:
+                    if len(test_ids) == 0:
+                        break
+                    if test_id not in test_ids:
+                        continue
+                    else:
+                        test_ids.remove(test_id)
+
+                if unique:
+                    # a shard only compares its own tests, so that it need
+                    # not generate the others.  Duplicates across shards
+                    # are dropped by results.consolidate
+                    sig = self._args_signature(op_args)
+                    is_dup = sig in seen
+                    seen.add(sig)
+
+                if (shard is not None and not sampling and 
+                        (test_id - 1) % num_shards != shard_index):
+                    continue
 
-            elif isinstance(self.op_error, pr.ErrorReport):
-                cat = 'FP' if self.framework_exc_msg is None else 'TP'
+                if unique and is_dup:
+                    self.num_duplicates += 1
+                    continue
 
-            else:
-                assert isinstance(self.op_error, list)
-                cat = 'FP' if self.framework_exc_msg is None else 'TP'
+                if test_id in done_ids:
+                    continue
+                yield test_id, op_args
 
-            stats[cat] += 1
-            progress = '  '.join(f'{c}: {stats[c]:-5d}' for c in cats)
-            print(f'\rTest: {test_id:-5d}  {progress}', end='')
-            arg_fields = ', '.join(f'{k}={op_args[k]}' for k in self.arg_order
-                    if k in op_args)
-            call = f'## {test_id}\t{cat}\t{self.op_path}: {arg_fields}'
-            print(f'\n\n{call}', file=report_fh)
-            
-            print('TensorFlow Exception', file=report_fh)
-            if show_traceback:
-                print(''.join(self.framework_tblines), file=report_fh)
-            print(f'{self.framework_exc_msg}\n', file=report_fh)
-
-            print(self._report(), file=report_fh)
-            edit_summary = self._report_edit_summary()
-            summary = f'{call}\t{edit_summary}'
-            print(summary, file=summary_fh)
-
-        print()
-        report_fh.close()
-        summary_fh.close()
+        if sandbox_workers is None:
+            pool = None
+            outcomes = ((test_id, op_args, self._run_test(op_args))
+                    for test_id, op_args in selected())
+        else:
+            settings = { attr: getattr(self, attr) for attr in CALL_SETTINGS
+                    if attr != 'verdict_cache' }
+            pool = sandbox.Pool(self.op_path, settings, sandbox_workers,
+                    test_timeout, max_worker_tests, max_worker_rss)
+            outcomes = pool.imap(selected())
+
+        # the outputs are closed, and so flushed, however the run ends, so
+        # that a resumed run reads every completed record
+        with ExitStack() as stack:
+            if pool is not None:
+                stack.callback(pool.close)
+            report_fh, summary_fh, records_fh = (
+                    stack.enter_context(open(
+                        results.output_path(out_dir, stem, ext), mode))
+                    for ext in ('txt', 'sum.txt', 'jsonl'))
+            for test_id, op_args, outcome in outcomes:
+                self._write_test(test_id, op_args, outcome, stats, shard,
+                        show_traceback, report_fh, summary_fh, records_fh)
+
+        if shard is None:
+            print()
+            if self.num_duplicates > 0:
+                print(f'Skipped {self.num_duplicates} duplicate tests')
+        stats['duplicates'] = self.num_duplicates
+        return stats
 
     # ============ PUBLIC API ====================
     def add_index(self, idx, description, rank_cons=None):
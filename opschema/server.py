@@ -0,0 +1,353 @@
+"""
+Long-lived process for running opschema.cl commands, started with
+'python -m opschema.cl serve'.
+
+The daemon imports TensorFlow once, and keeps registered ops and initialized
+schemas, together with their generation indexes, between commands.  While it
+listens on its Unix socket, opschema.cl forwards each command line to it
+instead of running it (see forward).  The client passes its stdin, stdout and
+stderr file descriptors over the socket, so the command reads and writes the
+client's terminal and files, and its exit status is passed back.  Commands run
+one at a time, in the client's working directory but with the daemon's
+environment, so for example the OPSCHEMA_CACHE_DIR in effect is the one the
+daemon was started with.  The client only uses a daemon run by the same user.
+A Ctrl-C in the client interrupts the command it forwarded, but not the
+daemon itself.
+
+When a schema file changes, the daemon reloads it before the next command.  A
+daemon started from other opschema sources is not used.
+"""
+import os
+import sys
+import json
+import signal
+import socket
+import struct
+import tempfile
+import traceback
+import contextlib
+import fire
+import opschema
+from . import diskcache
+from . import framework
+
+def socket_path():
+    """
+    Path of the daemon socket, from the environment variable OPSCHEMA_SOCKET
+    if set.  An empty OPSCHEMA_SOCKET disables the daemon, returning None.
+    Otherwise, the socket is in the user's XDG_RUNTIME_DIR, or the temporary
+    directory if that is not set.
+    """
+    path = os.environ.get('OPSCHEMA_SOCKET')
+    if path is None:
+        run_dir = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+        path = os.path.join(run_dir, f'opschema-{os.getuid()}.sock')
+    return path or None
+
+# signal by which clients interrupt the running command.  SIGINT, as from
+# Ctrl-C in the daemon's own terminal, stops the daemon
+INTERRUPT_SIGNAL = signal.SIGUSR1
+
+# op_path => OpSchema, kept between commands by the daemon.  None when not
+# serving
+SCHEMAS = None
+
+def init_op(op_path):
+    """
+    Same as opschema.init_op, but in the daemon, returns the schema kept from
+    earlier commands, with its generation settings reset to their defaults
+    """
+    if SCHEMAS is None:
+        return opschema.init_op(op_path)
+    op = SCHEMAS.get(op_path)
+    if op is None:
+        op = SCHEMAS[op_path] = opschema.init_op(op_path)
+    op.reset_gen_settings()
+    return op
+
+def _schema_module(op_path):
+    return f'{opschema.__name__}.ops.{op_path}'
+
+def _read_line(sock, data=b''):
+    while not data.endswith(b'\n'):
+        chunk = sock.recv(65536)
+        if not chunk:
+            raise ConnectionError('connection closed')
+        data += chunk
+    return json.loads(data)
+
+def _send_line(sock, obj):
+    sock.sendall(json.dumps(obj).encode('utf-8') + b'\n')
+
+@contextlib.contextmanager
+def _client_io(fds):
+    # point this process' stdin, stdout and stderr at those of the client.
+    # The streams get their own descriptors, so that output which could not
+    # be written before the client went away is discarded with them
+    std_fds = (0, 1, 2)
+    streams = (sys.stdin, sys.stdout, sys.stderr)
+    for fh in streams[1:]:
+        fh.flush()
+    saved = [ os.dup(fd) for fd in std_fds ]
+    try:
+        for fd, client_fd in zip(std_fds, fds):
+            os.dup2(client_fd, fd)
+        sys.stdin = open(os.dup(0), 'r')
+        sys.stdout = open(os.dup(1), 'w', buffering=1 if os.isatty(1) else -1)
+        sys.stderr = open(os.dup(2), 'w', buffering=1)
+        yield
+    finally:
+        for fh in (sys.stdin, sys.stdout, sys.stderr):
+            if any(fh is orig for orig in streams):
+                continue
+            try:
+                fh.close()
+            except OSError:
+                pass
+        sys.stdin, sys.stdout, sys.stderr = streams
+        for fd, saved_fd in zip(std_fds, saved):
+            os.dup2(saved_fd, fd)
+            os.close(saved_fd)
+
+@contextlib.contextmanager
+def _working_dir(path):
+    saved = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(saved)
+
+def _exit_status(ex):
+    if ex.code is None:
+        return 0
+    if isinstance(ex.code, int):
+        return ex.code
+    print(ex.code, file=sys.stderr)
+    return 1
+
+class Daemon(object):
+    """
+    Runs command lines for the fire command map {commands}, listening on
+    {path}
+    """
+    def __init__(self, commands, path):
+        self.commands = commands
+        self.path = path
+        self.core = diskcache.core_hash()
+        self.keys = {} # op_path => cache key of its loaded schema module
+        self.stopping = False
+        self.running = False # True while a command line runs.  See interrupt
+
+    def _drop_stale(self):
+        # forget the schemas whose schema file has changed since loading
+        for op_path, key in list(self.keys.items()):
+            try:
+                stale = diskcache.cache_key(op_path) != key
+            except (OSError, AttributeError):
+                stale = True
+            if stale:
+                self._forget(op_path)
+                sys.modules.pop(_schema_module(op_path), None)
+                del self.keys[op_path]
+
+    def _forget(self, op_path):
+        SCHEMAS.pop(op_path, None)
+        if op_path in opschema.REGISTRY:
+            opschema._unregister(op_path)
+
+    def _record_schemas(self):
+        for op_path in opschema.list_schemas():
+            if (op_path not in self.keys and
+                    _schema_module(op_path) in sys.modules):
+                self.keys[op_path] = diskcache.cache_key(op_path)
+
+    def interrupt(self, signum, frame):
+        """
+        Handler of INTERRUPT_SIGNAL, which raises KeyboardInterrupt in the
+        running command.  Interrupts arriving between commands are ignored
+        """
+        if self.running:
+            self.running = False
+            raise KeyboardInterrupt
+
+    def run(self, request, fds):
+        """
+        Run the command line of {request} with the client's standard file
+        descriptors {fds}, returning the reply
+        """
+        argv = request['argv']
+        if argv[:1] == ['stop']:
+            self.stopping = True
+            return { 'status': 0 }
+        if request['core'] != self.core:
+            return { 'error':
+                    f'opschema daemon at \'{self.path}\' runs different '
+                    f'opschema sources.  Restart it to use it' }
+
+        self._drop_stale()
+        with _client_io(fds), _working_dir(request['cwd']):
+            try:
+                self.running = True
+                fire.Fire(self.commands, command=argv, name=request['prog'])
+                self.running = False
+                status = 0
+            except SystemExit as ex:
+                self.running = False
+                status = _exit_status(ex)
+            except BaseException as ex:
+                self.running = False
+                if isinstance(ex, KeyboardInterrupt):
+                    status = 130
+                else:
+                    traceback.print_exc()
+                    status = 1
+                # the schemas may have been left mid-generation
+                for op_path in list(SCHEMAS) + opschema.list_registered():
+                    self._forget(op_path)
+        self._record_schemas()
+        return { 'status': status }
+
+    def _handle(self, conn):
+        _send_line(conn, { 'pid': os.getpid() })
+        data, fds, _, _ = socket.recv_fds(conn, 65536, 3)
+        try:
+            request = _read_line(conn, data)
+            reply = self.run(request, fds)
+        finally:
+            for fd in fds:
+                os.close(fd)
+        _send_line(conn, reply)
+
+    def serve(self):
+        """
+        Handle commands until stopped by the 'stop' command, SIGINT or SIGTERM
+        """
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            # create the socket file accessible only to this user
+            umask = os.umask(0o077)
+            try:
+                sock.bind(self.path)
+            finally:
+                os.umask(umask)
+            try:
+                sock.listen()
+                print(f'opschema daemon listening on {self.path}',
+                        file=sys.stderr, flush=True)
+                while not self.stopping:
+                    conn, _ = sock.accept()
+                    with conn:
+                        try:
+                            self._handle(conn)
+                        except (ConnectionError, ValueError, KeyError) as ex:
+                            print(f'Dropped request: {ex}', file=sys.stderr,
+                                    flush=True)
+            finally:
+                os.remove(self.path)
+
+def _connect(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+def _same_user(path, sock):
+    """
+    True if the socket file {path} and the process at the other end of the
+    connected {sock} belong to this user
+    """
+    if os.lstat(path).st_uid != os.getuid():
+        return False
+    if hasattr(socket, 'SO_PEERCRED'):
+        creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED,
+                struct.calcsize('3i'))
+        _, uid, _ = struct.unpack('3i', creds)
+        return uid == os.getuid()
+    return True
+
+def serve(commands, path=None, preload=()):
+    """
+    Run the daemon for the fire command map {commands} on socket {path}
+    (default socket_path()), after importing TensorFlow and registering the
+    ops {preload}
+    """
+    global SCHEMAS
+    if path is None:
+        path = socket_path()
+    if path is None:
+        raise RuntimeError(
+            f'The daemon is disabled by an empty OPSCHEMA_SOCKET')
+    if os.path.exists(path):
+        sock = _connect(path)
+        if sock is not None:
+            sock.close()
+            raise RuntimeError(
+                f'An opschema daemon is already listening on \'{path}\'')
+        # left by a daemon which did not exit cleanly
+        os.remove(path)
+
+    # SIGINT is ignored if started in the background
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    daemon = Daemon(commands, path)
+    signal.signal(INTERRUPT_SIGNAL, daemon.interrupt)
+    framework.get_module('tf')
+    SCHEMAS = {}
+    if preload:
+        opschema.register(*preload)
+    daemon._record_schemas()
+    try:
+        daemon.serve()
+    except KeyboardInterrupt:
+        pass
+
+def forward(argv, path=None):
+    """
+    Run the command line {argv} in the daemon listening on {path} (default
+    socket_path()), waiting for any command already running there.  Returns
+    the exit status, or None if there is no usable daemon.
+    """
+    if path is None:
+        path = socket_path()
+    if path is None or not os.path.exists(path):
+        return None
+    sock = _connect(path)
+    if sock is None:
+        return None
+
+    with sock:
+        try:
+            if not _same_user(path, sock):
+                print(f'Not using the opschema daemon socket \'{path}\', '
+                        f'which belongs to another user', file=sys.stderr)
+                return None
+            hello = _read_line(sock)
+            request = {
+                    'argv': list(argv[1:]),
+                    'prog': os.path.basename(argv[0]),
+                    'cwd': os.getcwd(),
+                    'core': diskcache.core_hash()
+                    }
+            data = json.dumps(request).encode('utf-8') + b'\n'
+            socket.send_fds(sock, [data], [0, 1, 2])
+        except (OSError, ValueError):
+            return None
+        while True:
+            try:
+                reply = _read_line(sock)
+                break
+            except KeyboardInterrupt:
+                # interrupt the command, as Ctrl-C would when run locally
+                os.kill(hello['pid'], INTERRUPT_SIGNAL)
+            except (OSError, ValueError):
+                print(f'Lost connection to the opschema daemon at '
+                        f'\'{path}\'', file=sys.stderr)
+                return 1
+
+    if 'error' in reply:
+        print(reply['error'], file=sys.stderr)
+        return None
+    return reply['status']
@@ -0,0 +1,33 @@
+import itertools
+from opschema import base
+
+def _covers(rows, sizes, strength):
+    for cols in itertools.combinations(range(len(sizes)), strength):
+        seen = { tuple(row[c] for c in cols) for row in rows }
+        combos = itertools.product(*(range(sizes[c]) for c in cols))
+        if any(combo not in seen for combo in combos):
+            return False
+    return True
+
+def test_covering_array_strength():
+    for sizes in ([2, 2, 2, 2], [3, 2, 4, 2, 3], [5, 1, 3]):
+        for strength in (1, 2, 3):
+            rows = base.covering_array(sizes, strength)
+            assert _covers(rows, sizes, strength)
+            assert all(0 <= v < s for row in rows for v, s in zip(row, sizes))
+
+def test_covering_array_pairwise_size():
+    # four binary columns are pairwise covered by 5 rows at best
+    rows = base.covering_array([2, 2, 2, 2], 2)
+    assert len(rows) <= 6
+    assert len(base.covering_array([3, 2, 4], 1)) == 4
+
+def test_covering_array_full_and_empty():
+    sizes = [2, 3]
+    assert base.covering_array(sizes, 2) == list(itertools.product(
+        range(2), range(3)))
+    assert base.covering_array([2, 0, 3], 2) == []
+
+def test_covering_array_deterministic():
+    sizes = [3, 3, 2, 4]
+    assert base.covering_array(sizes, 2) == base.covering_array(sizes, 2)
@@ -0,0 +1,44 @@
+import json
+from opschema import bench
+
+def _write(path, ops):
+    with open(path, 'w') as fh:
+        json.dump({ 'ops': ops }, fh)
+
+def test_compare(tmp_path):
+    base_file, cur_file = tmp_path / 'base.json', tmp_path / 'cur.json'
+    _write(base_file, {
+        'tf.a': { 'init_secs': 1.0, 'gen_per_sec': 100.0, 
+            'check_secs': { '0': 0.01, '1': 0.02 } },
+        'tf.b': { 'init_secs': 1.0 },
+        'tf.c': { 'error': 'RuntimeError: failed' }
+        })
+    _write(cur_file, {
+        'tf.a': { 'init_secs': 1.1, 'gen_per_sec': 40.0, 
+            'check_secs': { '0': 0.01, '1': 0.03 } },
+        'tf.b': { 'init_secs': 0.5 },
+        'tf.c': { 'init_secs': 5.0 },
+        'tf.d': { 'init_secs': 9.0 }
+        })
+    assert bench.compare(base_file, cur_file) == [
+            ('tf.a', 'check_secs.1', 0.02, 0.03),
+            ('tf.a', 'gen_per_sec', 100.0, 40.0) ]
+    assert bench.compare(base_file, cur_file, threshold=1.0) == [
+            ('tf.a', 'gen_per_sec', 100.0, 40.0) ]
+    assert bench.compare(base_file, base_file) == []
+
+def test_compare_reports_missing(tmp_path):
+    base_file, cur_file = tmp_path / 'base.json', tmp_path / 'cur.json'
+    _write(base_file, {
+        'tf.a': { 'init_secs': 1.0, 'check_secs': { '0': 0.01 } },
+        'tf.b': { 'init_secs': 1.0 },
+        'tf.c': { 'init_secs': 1.0 }
+        })
+    _write(cur_file, {
+        'tf.a': { 'init_secs': 1.0 },
+        'tf.b': { 'error': 'RuntimeError: failed' }
+        })
+    assert bench.compare(base_file, cur_file) == [
+            ('tf.a', 'check_secs.0', 0.01, None),
+            ('tf.b', 'init_secs', 1.0, None),
+            ('tf.c', 'init_secs', 1.0, None) ]
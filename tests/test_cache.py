@@ -0,0 +1,31 @@
+from opschema.cache import LRUCache
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert len(cache) == 2
+
+def test_stats():
+    cache = LRUCache(1)
+    cache.get('a')
+    cache.put('a', 1)
+    cache.get('a')
+    cache.put('b', 2)
+    assert cache.stats() == { 'size': 1, 'maxsize': 1, 'hits': 1,
+            'misses': 1, 'evictions': 1 }
+    cache.clear()
+    assert len(cache) == 0
+
+def test_rejects_bad_maxsize():
+    for maxsize in (0, -1, 1.5):
+        try:
+            LRUCache(maxsize)
+        except RuntimeError:
+            continue
+        assert False, f'accepted maxsize {maxsize}'
@@ -0,0 +1,78 @@
+import io
+import threading
+import contextlib
+import opschema
+from opschema.framework import tf
+
+def _op():
+    op = opschema.init_op('tf.nn.bias_add')
+    op._wrapped()
+    return op
+
+def _call(op, value_shape, bias_shape):
+    value = tf.zeros(value_shape)
+    bias = tf.zeros(bias_shape)
+    with contextlib.redirect_stderr(io.StringIO()):
+        try:
+            op.wrapped_op(value, bias)
+        except Exception:
+            pass
+
+def test_schema_is_context_after_concurrent_call():
+    op = _op()
+    # the schema's own context is released while the thread's call, which
+    # got another context, is still running
+    held = op._acquire_context()
+    assert held is op
+    acquired = threading.Event()
+    released = threading.Event()
+
+    def worker():
+        ctx = op._acquire_context()
+        acquired.set()
+        released.wait()
+        op._release_context(ctx)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    acquired.wait()
+    op._release_context(held)
+    released.set()
+    thread.join()
+    assert len(op.free_contexts) == 2
+
+    _call(op, [2, 3], [4])
+    assert op.op_error is not None
+    assert op.framework_exc_msg is not None
+
+    _call(op, [2, 3], [3])
+    assert op.op_error is None
+
+def test_concurrent_calls_keep_separate_verdicts():
+    op = _op()
+    errors = []
+
+    def worker(valid):
+        bias_shape = [3] if valid else [4]
+        for _ in range(20):
+            ctx = op._acquire_context()
+            try:
+                with contextlib.redirect_stderr(io.StringIO()):
+                    try:
+                        ctx._call_wrapped((tf.zeros([2, 3]),
+                            tf.zeros(bias_shape)), {})
+                    except Exception:
+                        pass
+                if (ctx.op_error is None) != valid:
+                    errors.append(valid)
+            finally:
+                op._release_context(ctx)
+
+    threads = [ threading.Thread(target=worker, args=(i % 2 == 0,))
+            for i in range(4) ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert op.free_contexts[-1] is op
@@ -0,0 +1,57 @@
+import json
+import opschema
+from opschema import corpus, oparg
+from opschema.error import SchemaError
+
+def test_encode_decode():
+    args = [ oparg.DataTensorArg([2, 3], 'float32'), 
+            oparg.ShapeTensorArg([4, 5]), oparg.ShapeListArg([1]), 
+            oparg.ShapeTensor2DArg([[1, 2], [3, 4]]), oparg.IntArg(7),
+            oparg.ValueArg('NHWC'), oparg.ValueArg((1, (2, 3))) ]
+    for arg in args:
+        enc = json.loads(json.dumps(arg.encode()))
+        dec = oparg.decode(enc)
+        assert type(dec) is type(arg)
+        assert dec.ctor_args() == arg.ctor_args()
+        assert dec.signature() == arg.signature()
+
+def test_decode_unknown_type():
+    try:
+        oparg.decode({ 'type': 'OpSchema', 'args': [] })
+    except SchemaError:
+        return
+    assert False, 'decoded an unknown type'
+
+def test_write_read(tmp_path):
+    op = opschema.init_op('tf.nn.bias_add')
+    path = str(tmp_path / 'bias_add.corpus')
+    assert corpus.write(op, path, rand_seed=3, max_tests=10) == 10
+    expected = list(op.generate_args(3))[:10]
+
+    with corpus.Corpus(path) as cor:
+        assert cor.op_path == 'tf.nn.bias_add'
+        assert len(cor) == 10
+        cor.check_settings(3, 0, 0)
+        for (test_id, op_args), exp in zip(cor, expected):
+            assert ({ k: v.signature() for k, v in op_args.items() } ==
+                    { k: v.signature() for k, v in exp.items() })
+        assert str(cor.get(7)['value']) == str(expected[6]['value'])
+        try:
+            cor.check_settings(4, 0, 0)
+        except SchemaError:
+            pass
+        else:
+            assert False, 'accepted other settings'
+
+def test_validate_rejects_other_settings(tmp_path):
+    op = opschema.init_op('tf.nn.bias_add')
+    path = str(tmp_path / 'bias_add.corpus')
+    corpus.write(op, path, rand_seed=3, max_tests=5)
+    for test_edits, rand_seed in ((1, 3), (0, 4)):
+        try:
+            op.validate(str(tmp_path), None, None, 0, test_edits, rand_seed,
+                    corpus_path=path)
+        except SchemaError as ex:
+            assert 'generated with' in str(ex)
+        else:
+            assert False, 'accepted a corpus with other settings'
@@ -0,0 +1,23 @@
+import opschema
+from opschema import infer as nf
+
+def _bounds(value_shape, bias_shape, slack, layout=1):
+    op = opschema.init_op('tf.nn.bias_add')
+    obs_shapes = { 'value': value_shape, 'bias': bias_shape }
+    return nf.rank_bounds(op, layout, obs_shapes, {}, slack)
+
+def test_rank_bounds_exact():
+    # value is 'bsc', so its rank fixes the spatial rank
+    assert _bounds([2, 3, 4], [4], 0) == { 'b': (1, 1), 's': (1, 1), 
+            'c': (1, 1) }
+    assert _bounds([2, 3], [3], 0)['s'] == (0, 0)
+
+def test_rank_bounds_slack():
+    assert _bounds([2, 3, 4], [4], 1)['s'] == (0, 2)
+    # clipped to the schema's rank range of 's'
+    assert _bounds([2, 3, 4], [4], 5)['s'] == (0, 3)
+
+def test_rank_bounds_unsatisfiable():
+    # bias has rank 1 in every valid call
+    assert _bounds([2, 3, 4], [4, 1], 0) is None
+    assert _bounds([2, 3, 4], [4, 1], 1) is not None
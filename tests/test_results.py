@@ -0,0 +1,93 @@
+import os
+from opschema import results
+
+OP = 'tf.nn.bias_add'
+
+def _write_shard(out_dir, stem, test_ids, category='TP'):
+    # the layout written by OpSchema._write_test
+    path = lambda ext: results.output_path(out_dir, stem, ext)
+    with open(path('txt'), 'w') as report_fh, \
+            open(path('sum.txt'), 'w') as summary_fh, \
+            open(path('jsonl'), 'w') as records_fh:
+        for test_id in test_ids:
+            call = f'## {test_id}\t{category}\t{OP}: value=[{test_id}]'
+            print(f'\n\n{call}', file=report_fh)
+            print(f'report of test {test_id}\n', file=report_fh)
+            print(f'{call}\tedits', file=summary_fh)
+            results.write_record(records_fh, { 'test_id': test_id, 
+                'category': category, 'signature': f'sig{test_id}' })
+
+def _read(out_dir, ext):
+    with open(results.output_path(out_dir, OP, ext)) as fh:
+        return fh.read()
+
+def test_split_entries():
+    content = ('preamble\n\n\n## 1\tTP\ta\nbody 1\n\n\n## 12\tFN\tb\n'
+            'body 12\n')
+    preamble, entries = results.split_entries(content)
+    assert preamble == 'preamble\n'
+    assert entries == [ (1, '\n\n## 1\tTP\ta\nbody 1\n'), 
+            (12, '\n\n## 12\tFN\tb\nbody 12\n') ]
+    assert results.split_entries('no tests') == ('no tests', [])
+
+def test_merge_matches_single_run(tmp_path):
+    single, sharded = tmp_path / 'single', tmp_path / 'sharded'
+    single.mkdir()
+    sharded.mkdir()
+    _write_shard(single, OP, range(1, 8))
+    for index in range(3):
+        _write_shard(sharded, f'{OP}.shard{index}', range(index + 1, 8, 3))
+
+    assert results.consolidate(sharded, OP) == set(range(1, 8))
+    for ext in results.EXTENSIONS:
+        assert _read(sharded, ext) == _read(single, ext)
+    assert results.shard_paths(sharded, OP, 'txt') == []
+
+def test_read_records_skips_partial_line(tmp_path):
+    _write_shard(tmp_path, OP, [1, 2])
+    path = results.output_path(tmp_path, OP, 'jsonl')
+    with open(path, 'a') as fh:
+        fh.write('{"test_id": 3, "categ')
+    assert [ r['test_id'] for r in results.read_records(path) ] == [1, 2]
+    assert results.completed_ids(tmp_path, OP) == {1, 2}
+    assert results.read_records(tmp_path / 'missing.jsonl') == []
+
+def test_consolidate_drops_incomplete_tests(tmp_path):
+    _write_shard(tmp_path, OP, [1, 2])
+    _write_shard(tmp_path, f'{OP}.shard0', [3, 4])
+    # test 4 was interrupted before its record was written
+    path = results.output_path(tmp_path, f'{OP}.shard0', 'jsonl')
+    with open(path, 'w') as fh:
+        results.write_record(fh, { 'test_id': 3, 'category': 'TP' })
+
+    assert results.consolidate(tmp_path, OP) == {1, 2, 3}
+    for ext in ('txt', 'sum.txt'):
+        _, entries = results.split_entries(_read(tmp_path, ext))
+        assert [ test_id for test_id, _ in entries ] == [1, 2, 3]
+
+def test_duplicate_ids():
+    records = [ { 'test_id': 5, 'signature': 'a' }, 
+            { 'test_id': 2, 'signature': 'a' },
+            { 'test_id': 3, 'signature': 'b' },
+            { 'test_id': 4 },
+            { 'test_id': 7, 'signature': 'b' } ]
+    assert results.duplicate_ids(records) == {5, 7}
+
+def test_consolidate_drops_duplicates_across_shards(tmp_path):
+    _write_shard(tmp_path, f'{OP}.shard0', [1, 3])
+    _write_shard(tmp_path, f'{OP}.shard1', [2, 4])
+    # test 4 repeats test 1 of the other shard
+    path = results.output_path(tmp_path, f'{OP}.shard1', 'jsonl')
+    with open(path, 'w') as fh:
+        results.write_record(fh, { 'test_id': 2, 'signature': 'sig2' })
+        results.write_record(fh, { 'test_id': 4, 'signature': 'sig1' })
+
+    assert results.consolidate(tmp_path, OP, unique=True) == {1, 2, 3}
+    _, entries = results.split_entries(_read(tmp_path, 'sum.txt'))
+    assert [ test_id for test_id, _ in entries ] == [1, 2, 3]
+
+def test_signature_digest():
+    sig = (('bias', ('DataTensorArg', ((4,), 'float32'))),)
+    assert results.signature_digest(sig) == results.signature_digest(
+            (('bias', ('DataTensorArg', ((4,), 'float32'))),))
+    assert results.signature_digest(sig) != results.signature_digest(())